@@ -0,0 +1,36 @@
+"""add statistics image cache
+
+Revision ID: 098cbf60b690
+Revises: f08348ed6414
+Create Date: 2026-10-17 15:08:52.730146
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '098cbf60b690'
+down_revision: Union[str, None] = 'f08348ed6414'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'statistics_image_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('file_id', sa.String(), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    op.create_index(op.f('ix_statistics_image_cache_last_used_at'), 'statistics_image_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_statistics_image_cache_last_used_at'), table_name='statistics_image_cache')
+    op.drop_table('statistics_image_cache')
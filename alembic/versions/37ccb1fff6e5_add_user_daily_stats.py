@@ -0,0 +1,66 @@
+"""add user daily stats
+
+Revision ID: 37ccb1fff6e5
+Revises: c3b76b6337e4
+Create Date: 2026-10-17 10:41:52.660318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '37ccb1fff6e5'
+down_revision: Union[str, None] = 'c3b76b6337e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_daily_stats',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('stat_date', sa.Date(), nullable=False),
+        sa.Column('shifts_count', sa.Integer(), nullable=False),
+        sa.Column('duration_seconds', sa.Float(), nullable=False),
+        sa.Column('orders_count', sa.Integer(), nullable=False),
+        sa.Column('total_mileage', sa.Float(), nullable=False),
+        sa.Column('revenue_from_time', sa.Float(), nullable=False),
+        sa.Column('revenue_from_orders', sa.Float(), nullable=False),
+        sa.Column('total_tips', sa.Float(), nullable=False),
+        sa.Column('food_expenses', sa.Float(), nullable=False),
+        sa.Column('other_expenses', sa.Float(), nullable=False),
+        sa.Column('mileage_cost', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'stat_date'),
+    )
+
+    op.execute("""
+        INSERT INTO user_daily_stats (
+            user_id, stat_date, shifts_count, duration_seconds, orders_count, total_mileage,
+            revenue_from_time, revenue_from_orders, total_tips, food_expenses, other_expenses, mileage_cost
+        )
+        SELECT user_id,
+               CAST(timezone('Europe/Moscow', end_time) AS DATE),
+               COUNT(id),
+               SUM(GREATEST(EXTRACT(EPOCH FROM end_time - start_time), 0)),
+               SUM(orders_count),
+               SUM(total_mileage),
+               SUM(GREATEST(EXTRACT(EPOCH FROM end_time - start_time), 0) / 3600.0 * rate),
+               SUM(orders_count * order_rate),
+               SUM(total_tips),
+               SUM(food_expenses),
+               SUM(other_expenses),
+               SUM(total_mileage * mileage_rate)
+        FROM shifts
+        WHERE status = 'COMPLETED' AND end_time IS NOT NULL
+        GROUP BY user_id, CAST(timezone('Europe/Moscow', end_time) AS DATE)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_daily_stats')
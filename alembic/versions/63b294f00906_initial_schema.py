@@ -0,0 +1,91 @@
+"""initial schema
+
+Revision ID: 63b294f00906
+Revises: 
+Create Date: 2026-10-17 10:02:11.418263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '63b294f00906'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases initialised with create_db_and_tables() already have these tables.
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('users'):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.BigInteger(), nullable=False),
+            sa.Column('username', sa.String(), nullable=True),
+            sa.Column('default_rate', sa.Float(), nullable=False),
+            sa.Column('default_order_rate', sa.Float(), nullable=False),
+            sa.Column('default_mileage_rate', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id'),
+            sa.UniqueConstraint('username'),
+        )
+        op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+
+    if not inspector.has_table('shifts'):
+        op.create_table(
+            'shifts',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.BigInteger(), nullable=False),
+            sa.Column('status', sa.Enum('FORMING', 'ACTIVE', 'COMPLETED', name='shiftstatus'), nullable=False),
+            sa.Column('orders_count', sa.Integer(), nullable=False),
+            sa.Column('total_mileage', sa.Float(), nullable=False),
+            sa.Column('total_tips', sa.Float(), nullable=False),
+            sa.Column('total_expenses', sa.Float(), nullable=False),
+            sa.Column('rate', sa.Float(), nullable=False),
+            sa.Column('order_rate', sa.Float(), nullable=False),
+            sa.Column('mileage_rate', sa.Float(), nullable=False),
+            sa.Column('start_time', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.user_id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index(op.f('ix_shifts_id'), 'shifts', ['id'], unique=False)
+        op.create_index(op.f('ix_shifts_user_id'), 'shifts', ['user_id'], unique=False)
+
+    if not inspector.has_table('shift_events'):
+        op.create_table(
+            'shift_events',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('shift_id', sa.Integer(), nullable=False),
+            sa.Column('event_type', sa.Enum(
+                'START_SHIFT', 'COMPLETE_SHIFT', 'ADD_ORDER', 'UPDATE_ORDER', 'ADD_EXPENSE',
+                'ADD_TIPS', 'ADD_MILEAGE', 'UPDATE_INITIAL_DATA', name='shifteventtype'
+            ), nullable=False),
+            sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+            sa.Column('details', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+            sa.ForeignKeyConstraint(['shift_id'], ['shifts.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index(op.f('ix_shift_events_id'), 'shift_events', ['id'], unique=False)
+        op.create_index(op.f('ix_shift_events_shift_id'), 'shift_events', ['shift_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_shift_events_shift_id'), table_name='shift_events')
+    op.drop_index(op.f('ix_shift_events_id'), table_name='shift_events')
+    op.drop_table('shift_events')
+    op.drop_index(op.f('ix_shifts_user_id'), table_name='shifts')
+    op.drop_index(op.f('ix_shifts_id'), table_name='shifts')
+    op.drop_table('shifts')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_table('users')
+    sa.Enum(name='shifteventtype').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='shiftstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,79 @@
+"""add shift hot path indexes
+
+Revision ID: 6795644fafe5
+Revises: eb8dc9f70544
+Create Date: 2026-10-17 11:48:30.271560
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6795644fafe5'
+down_revision: Union[str, None] = 'eb8dc9f70544'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = (
+    ('uq_shifts_user_id_active', 'shifts'),
+    ('ix_shifts_user_id_status_end_time', 'shifts'),
+    ('ix_shift_events_shift_id_timestamp', 'shift_events'),
+)
+
+
+def _drop_invalid_indexes() -> None:
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, and IF NOT EXISTS would keep it as is.
+    # Offline SQL cannot inspect the catalog; check pg_index.indisvalid by hand before running it.
+    if context.is_offline_mode():
+        return
+    for index_name, table_name in INDEXES:
+        invalid = op.get_bind().execute(sa.text("""
+            SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = :name AND NOT i.indisvalid
+              AND c.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = current_schema())
+        """), {"name": index_name}).scalar()
+        if invalid:
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not context.is_offline_mode():
+        duplicates = op.get_bind().execute(sa.text("""
+            SELECT user_id FROM shifts WHERE status = 'ACTIVE' GROUP BY user_id HAVING COUNT(*) > 1
+        """)).scalars().all()
+        if duplicates:
+            raise RuntimeError(
+                f"Users {duplicates} have more than one ACTIVE shift; complete or delete the extra shifts "
+                "before creating uq_shifts_user_id_active."
+            )
+
+    # CREATE INDEX CONCURRENTLY cannot run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        _drop_invalid_indexes()
+        op.create_index(
+            'uq_shifts_user_id_active', 'shifts', ['user_id'], unique=True,
+            postgresql_where=sa.text("status = 'ACTIVE'"), postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_shifts_user_id_status_end_time', 'shifts',
+            ['user_id', 'status', sa.text('end_time DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'ix_shift_events_shift_id_timestamp', 'shift_events', ['shift_id', 'timestamp'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_shift_events_shift_id_timestamp', table_name='shift_events', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_shifts_user_id_status_end_time', table_name='shifts', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('uq_shifts_user_id_active', table_name='shifts', postgresql_concurrently=True, if_exists=True)
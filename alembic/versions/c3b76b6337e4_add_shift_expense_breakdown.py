@@ -0,0 +1,64 @@
+"""add shift expense breakdown
+
+Revision ID: c3b76b6337e4
+Revises: 63b294f00906
+Create Date: 2026-10-17 10:14:37.902115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3b76b6337e4'
+down_revision: Union[str, None] = '63b294f00906'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of src.utils.statistics_config.TAX_RATE at the time of this migration; later changes there do not
+# rewrite net_profit values that were backfilled here.
+TAX_RATE = 0.05
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('shifts', sa.Column('food_expenses', sa.Float(), server_default='0', nullable=False))
+    op.add_column('shifts', sa.Column('other_expenses', sa.Float(), server_default='0', nullable=False))
+    op.add_column('shifts', sa.Column('net_profit', sa.Float(), nullable=True))
+
+    op.execute("""
+        UPDATE shifts
+        SET food_expenses = e.food_expenses,
+            other_expenses = e.other_expenses
+        FROM (
+            SELECT shift_id,
+                   SUM(CASE WHEN COALESCE(details ->> 'category_code', 'other') = 'food'
+                            THEN (details ->> 'amount')::float ELSE 0 END) AS food_expenses,
+                   SUM(CASE WHEN COALESCE(details ->> 'category_code', 'other') = 'other'
+                            THEN (details ->> 'amount')::float ELSE 0 END) AS other_expenses
+            FROM shift_events
+            WHERE event_type = 'ADD_EXPENSE' AND details ? 'amount'
+            GROUP BY shift_id
+        ) AS e
+        WHERE shifts.id = e.shift_id
+    """)
+
+    op.execute(f"""
+        UPDATE shifts
+        SET net_profit = (
+                GREATEST(EXTRACT(EPOCH FROM end_time - start_time), 0) / 3600.0 * rate
+                + orders_count * order_rate
+                + total_tips
+            ) * (1 - {TAX_RATE})
+            - food_expenses - other_expenses - total_mileage * mileage_rate
+        WHERE status = 'COMPLETED' AND end_time IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('shifts', 'net_profit')
+    op.drop_column('shifts', 'other_expenses')
+    op.drop_column('shifts', 'food_expenses')
@@ -0,0 +1,40 @@
+"""add user completed shifts count
+
+Revision ID: eb8dc9f70544
+Revises: 37ccb1fff6e5
+Create Date: 2026-10-17 11:20:05.113874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'eb8dc9f70544'
+down_revision: Union[str, None] = '37ccb1fff6e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('completed_shifts_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute("""
+        UPDATE users
+        SET completed_shifts_count = c.shifts_count
+        FROM (
+            SELECT user_id, COUNT(id) AS shifts_count
+            FROM shifts
+            WHERE status = 'COMPLETED'
+            GROUP BY user_id
+        ) AS c
+        WHERE users.user_id = c.user_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'completed_shifts_count')
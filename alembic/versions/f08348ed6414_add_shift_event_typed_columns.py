@@ -0,0 +1,48 @@
+"""add shift event typed columns
+
+Revision ID: f08348ed6414
+Revises: 29363ec082e6
+Create Date: 2026-10-17 14:21:09.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f08348ed6414'
+down_revision: Union[str, None] = '29363ec082e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('shift_events', sa.Column('amount', sa.Float(), nullable=True))
+    op.add_column('shift_events', sa.Column('category_code', sa.String(), nullable=True))
+    op.add_column('shift_events', sa.Column('count', sa.Integer(), nullable=True))
+    op.add_column('shift_events', sa.Column('distance_km', sa.Float(), nullable=True))
+
+    op.execute("""
+        UPDATE shift_events
+        SET amount = CASE WHEN jsonb_typeof(details -> 'amount') = 'number'
+                          THEN (details ->> 'amount')::float END,
+            category_code = CASE WHEN event_type = 'ADD_EXPENSE'
+                                 THEN COALESCE(details ->> 'category_code', 'other')
+                                 ELSE details ->> 'category_code' END,
+            count = CASE WHEN jsonb_typeof(details -> 'count') = 'number'
+                         THEN round((details ->> 'count')::numeric)::integer END,
+            distance_km = CASE WHEN jsonb_typeof(details -> 'distance_km') = 'number'
+                               THEN (details ->> 'distance_km')::float END
+        WHERE details ?| array['amount', 'category_code', 'count', 'distance_km'] OR event_type = 'ADD_EXPENSE'
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('shift_events', 'distance_km')
+    op.drop_column('shift_events', 'count')
+    op.drop_column('shift_events', 'category_code')
+    op.drop_column('shift_events', 'amount')
@@ -0,0 +1,299 @@
+import os
+
+# The benchmarks never touch Telegram or Postgres, but importing src needs the required settings to be present.
+for _name, _value in {
+    "APP_TELEGRAM_BOT_TOKEN": "0:benchmark",
+    "APP_POSTGRES_USER": "benchmark",
+    "APP_POSTGRES_PASSWORD": "benchmark",
+    "APP_POSTGRES_HOST": "localhost",
+    "APP_POSTGRES_PORT": "5432",
+    "APP_POSTGRES_DB": "benchmark",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import logging
+import math
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.synthetic import make_events, make_shifts
+from src.config import settings
+from src.db.models import ShiftStatus
+from src.keyboards.history import history_selection_keyboard
+from src.utils.active_shift_cache import ActiveShiftSnapshot
+from src.utils.formatters import format_completed_shift_details_message, get_active_shift_message_text
+from src.utils.statistics_aggregate import StatisticsAggregate, shift_columns
+from src.utils.statistics_generator import (
+    IMAGE_FORMATS, build_statistics_template_data, format_statistics_text_report, statistics_renderer
+)
+
+DEFAULT_SIZES = (10, 1000, 20000)
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+HISTORY_PAGE_SIZE = 6
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable[[], Any]
+    iterations: int
+    # Pillow allocates image buffers in C, which tracemalloc never sees; such cases measure process RSS instead.
+    rss: bool = False
+
+
+def build_cases(sizes, formats) -> List[Case]:
+    cases = []
+    for size in sizes:
+        shifts = make_shifts(size, seed=size)
+        newest = shifts[-1]
+        newest.events = make_events(newest, seed=size)
+        first_page = list(reversed(shifts[-HISTORY_PAGE_SIZE:]))
+        total_pages = math.ceil(size / HISTORY_PAGE_SIZE)
+        active = replace(
+            ActiveShiftSnapshot.from_shift(newest, newest.events, settings.active_shift_cache_events),
+            status=ShiftStatus.ACTIVE
+        )
+        period_end = newest.end_time
+
+        columns = shift_columns(shifts)
+        data_for_template = build_statistics_template_data(StatisticsAggregate.from_columns(**columns), "всё время", None, period_end)
+
+        def statistics_data(columns=columns, period_end=period_end):
+            return build_statistics_template_data(StatisticsAggregate.from_columns(**columns), "всё время", None, period_end)
+
+        cases += [
+            Case(f"statistics_aggregate[{size}]", lambda columns=columns: StatisticsAggregate.from_columns(**columns), 500),
+            Case(f"statistics_template[{size}]", statistics_data, 500),
+            Case(f"statistics_text_report[{size}]",
+                 lambda data_for_template=data_for_template: format_statistics_text_report(data_for_template, "всё время"), 500),
+            Case(f"active_shift_message[{size}]", lambda active=active: get_active_shift_message_text(active), 500),
+            Case(f"completed_shift_details[{size}]", lambda newest=newest: format_completed_shift_details_message(newest), 500),
+            Case(
+                f"history_keyboard[{size}]",
+                lambda first_page=first_page, total_pages=total_pages: history_selection_keyboard(first_page, 1, total_pages, size > HISTORY_PAGE_SIZE),
+                500
+            ),
+        ]
+
+    data_for_template = build_statistics_template_data(
+        StatisticsAggregate.from_shifts(make_shifts(30)), "всё время", None, datetime.now(timezone.utc)
+    )
+    statistics_renderer.preload()
+    for image_format in formats:
+        def render(image_format=image_format):
+            renderer = statistics_renderer
+            previous, renderer.image_format = renderer.image_format, image_format
+            try:
+                return renderer.render(data_for_template, "всё время")
+            finally:
+                renderer.image_format = previous
+        cases.append(Case(f"render_image[{image_format}]", render, 10, rss=True))
+    return cases
+
+
+async def _call(fn: Callable[[], Any]) -> Any:
+    result = fn()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower, upper = math.floor(position), math.ceil(position)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _proc_status_kib(field: str) -> Optional[float]:
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith(f"{field}:"):
+                    return float(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    # Writing 5 to clear_refs resets VmHWM on Linux, so the peak covers only the measured call.
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+async def rss_growth_kib(case: Case) -> float:
+    if _reset_peak_rss():
+        before = _proc_status_kib("VmRSS")
+        await _call(case.fn)
+        return _proc_status_kib("VmHWM") - before
+    # Without a resettable peak, fall back to the whole process's maximum RSS, interpreter included.
+    await _call(case.fn)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024 if sys.platform == "darwin" else float(max_rss)
+
+
+def peak_rss_kib(case: Case) -> float:
+    # Each case runs once in a fresh interpreter, so an earlier case's buffers cannot hide or inflate its peak.
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--rss-case", case.name, "--sizes", "--formats", *IMAGE_FORMATS],
+        cwd=PROJECT_ROOT, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+async def measure(case: Case) -> Dict[str, float]:
+    await _call(case.fn)
+
+    timings = []
+    gc.collect()
+    for _ in range(case.iterations):
+        started = time.perf_counter()
+        await _call(case.fn)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    if case.rss:
+        peak_kib = peak_rss_kib(case)
+    else:
+        # tracemalloc slows allocation down, so peak memory comes from a separate, untimed run.
+        gc.collect()
+        tracemalloc.start()
+        try:
+            await _call(case.fn)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_kib = peak / 1024
+
+    return {
+        "iterations": case.iterations,
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "p50_ms": percentile(timings, 0.50) * 1000,
+        "p90_ms": percentile(timings, 0.90) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+        "max_ms": timings[-1] * 1000,
+        "peak_kib": peak_kib,
+        "peak_source": "rss" if case.rss else "python_heap",
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p90_ms", "peak_kib"):
+            if metric == "peak_kib" and previous.get("peak_source", "python_heap") != result["peak_source"]:
+                continue
+            if previous[metric] > 0 and result[metric] > previous[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name} {metric}: {previous[metric]:.3f} -> {result[metric]:.3f} "
+                    f"(+{(result[metric] / previous[metric] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def print_results(results: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Dict[str, float]]] = None):
+    header = f"{'case':<36} {'iter':>5} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'peak KiB':>10} {'memory':>11}"
+    if baseline:
+        header += f" {'p50 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        line = (f"{name:<36} {result['iterations']:>5} {result['p50_ms']:>10.3f} {result['p90_ms']:>10.3f} "
+                f"{result['p99_ms']:>10.3f} {result['peak_kib']:>10.1f} {result.get('peak_source', 'python_heap'):>11}")
+        previous = (baseline or {}).get(name)
+        if previous and previous["p50_ms"] > 0:
+            line += f" {(result['p50_ms'] / previous['p50_ms'] - 1) * 100:>+11.0f}%"
+        print(line)
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+async def run(args: argparse.Namespace) -> int:
+    cases = build_cases(args.sizes, args.formats)
+    if args.rss_case:
+        case = next(case for case in cases if case.name == args.rss_case)
+        print(await rss_growth_kib(case))
+        return 0
+    if args.filter:
+        cases = [case for case in cases if args.filter in case.name]
+
+    results = {}
+    for case in cases:
+        results[case.name] = await measure(case)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline_file = json.load(file)
+        baseline = baseline_file["results"]
+        print(f"Comparing with {args.compare} ({baseline_file['environment']['platform']}, "
+              f"Python {baseline_file['environment']['python']}, {baseline_file['environment']['created_at']})")
+
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({"environment": environment(), "results": results}, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Baseline saved to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions over {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%}.")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark statistics, rendering and message formatting hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(DEFAULT_SIZES), help="Synthetic user sizes in shifts.")
+    parser.add_argument("--formats", nargs="+", default=list(IMAGE_FORMATS), choices=list(IMAGE_FORMATS), help="Image encoders to benchmark.")
+    parser.add_argument("--filter", help="Only run cases whose name contains this text.")
+    parser.add_argument("--save", nargs="?", const=str(DEFAULT_BASELINE), help="Save results as a baseline.")
+    parser.add_argument("--compare", nargs="?", const=str(DEFAULT_BASELINE), help="Compare with a saved baseline; exits 1 on regressions.")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown or memory growth before a case counts as regressed.")
+    parser.add_argument("--rss-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("src").setLevel(logging.ERROR)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import random
+from datetime import datetime, timedelta
+from typing import List
+from zoneinfo import ZoneInfo
+
+from src.db.models import Shift, ShiftEvent, ShiftEventType, ShiftStatus
+from src.db.statistics import PeriodTotals
+
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+SYNTHETIC_START = datetime(2024, 1, 1, 9, 0, tzinfo=MOSCOW_TZ)
+
+
+def make_shifts(count: int, user_id: int = 1, seed: int = 0) -> List[Shift]:
+    # One shift per day, newest last; totals follow the ranges real couriers report.
+    rng = random.Random(seed)
+    shifts = []
+    for index in range(count):
+        start_time = SYNTHETIC_START + timedelta(days=index, minutes=rng.randint(-60, 60))
+        end_time = start_time + timedelta(hours=rng.uniform(4, 12))
+        food_expenses = round(rng.choice([0, 0, rng.uniform(150, 600)]), 2)
+        other_expenses = round(rng.choice([0, 0, 0, rng.uniform(50, 400)]), 2)
+        shift = Shift(
+            id=index + 1,
+            user_id=user_id,
+            status=ShiftStatus.COMPLETED,
+            orders_count=rng.randint(5, 40),
+            total_mileage=round(rng.uniform(20, 180), 1),
+            total_tips=round(rng.uniform(0, 1500), 2),
+            total_expenses=food_expenses + other_expenses,
+            food_expenses=food_expenses,
+            other_expenses=other_expenses,
+            rate=rng.choice([250.0, 300.0, 350.0]),
+            order_rate=rng.choice([40.0, 50.0, 60.0]),
+            mileage_rate=rng.choice([4.0, 5.0, 6.0]),
+            start_time=start_time,
+            end_time=end_time,
+        )
+        shift.net_profit = PeriodTotals.from_shift(shift).net_profit
+        shifts.append(shift)
+    return shifts
+
+
+def make_events(shift: Shift, seed: int = 0) -> List[ShiftEvent]:
+    # Mirrors what the handlers write: one event per order tap, a few tips and expenses, mileage at the end.
+    rng = random.Random(seed)
+    duration = (shift.end_time - shift.start_time).total_seconds()
+
+    def at(fraction: float) -> datetime:
+        return shift.start_time + timedelta(seconds=duration * fraction)
+
+    events = [ShiftEvent(shift_id=shift.id, event_type=ShiftEventType.START_SHIFT, timestamp=shift.start_time,
+                         details={"message": "Смена начата"})]
+    for _ in range(shift.orders_count):
+        events.append(ShiftEvent(shift_id=shift.id, event_type=ShiftEventType.ADD_ORDER, timestamp=at(rng.random()),
+                                 details={"count": 1, "description": "1 заказ(а)"}, count=1))
+    for _ in range(rng.randint(0, 5)):
+        tips = round(rng.uniform(50, 300), 2)
+        events.append(ShiftEvent(shift_id=shift.id, event_type=ShiftEventType.ADD_TIPS, timestamp=at(rng.random()),
+                                 details={"amount": tips, "currency": "RUB", "description": f"+{tips} руб."}, amount=tips))
+    for category_code, amount in (("food", shift.food_expenses), ("other", shift.other_expenses)):
+        if amount:
+            events.append(ShiftEvent(shift_id=shift.id, event_type=ShiftEventType.ADD_EXPENSE, timestamp=at(rng.random()),
+                                     details={"amount": amount, "category_code": category_code, "description": f"-{amount} руб."},
+                                     amount=amount, category_code=category_code))
+    events.append(ShiftEvent(shift_id=shift.id, event_type=ShiftEventType.ADD_MILEAGE, timestamp=at(0.99),
+                             details={"distance_km": shift.total_mileage, "description": f"{shift.total_mileage} км"},
+                             distance_km=shift.total_mileage))
+    events.append(ShiftEvent(shift_id=shift.id, event_type=ShiftEventType.COMPLETE_SHIFT, timestamp=shift.end_time,
+                             details={"message": "Смена завершена"}))
+    return sorted(events, key=lambda e: e.timestamp)
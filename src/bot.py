@@ -1,23 +1,57 @@
 import logging
 import asyncio
+from typing import Optional
+from datetime import timedelta
 from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 
 from src.config import settings
-from src.db.engine import AsyncSessionFactory, dispose_engine
+from src.db.engine import AsyncSessionFactory, dispose_engine, engine, start_pool_metrics, stop_pool_metrics
+from src.db.fsm_storage import PostgresStorage
 from src.db.middlewares.db import DBSessionMiddleware
+from src.middlewares.ordering import UserOrderingMiddleware
+from src.middlewares.rendering import RenderResetMiddleware
+from src.utils.ephemeral import ephemeral_messages
+from src.utils.message_renderer import message_renderer
+from src.utils.render_pool import render_pool
+from src.utils.statistics_generator import preload_render_assets
+from src.supervisor import run_supervisor
+from src.webhook import run_webhook
 from src.handlers import user_handlers, shift_handlers, main_menu, orders, initial_data, history, in_developement, statistics_handlers
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-async def main():
-    bot = Bot(token=settings.telegram_bot_token)
-    dp = Dispatcher(storage=MemoryStorage())
+def create_fsm_storage() -> BaseStorage:
+    if settings.fsm_storage == "memory":
+        logger.info("Using in-memory FSM storage")
+        return MemoryStorage()
+    logger.info("Using Postgres FSM storage")
+    return PostgresStorage(
+        engine,
+        ttl=timedelta(seconds=settings.fsm_ttl_seconds),
+        flush_interval=settings.fsm_flush_interval,
+        cache_size=settings.fsm_cache_size,
+        cache_ttl=settings.fsm_cache_ttl_seconds
+    )
+
+async def start_render_pool():
+    render_pool.start(initializer=preload_render_assets)
+
+def create_dispatcher(storage: Optional[BaseStorage] = None) -> Dispatcher:
+    dp = Dispatcher(storage=storage or create_fsm_storage())
+
+    dp.update.outer_middleware(UserOrderingMiddleware(settings.max_in_flight_updates))
+    dp.startup.register(start_pool_metrics)
+    dp.shutdown.register(stop_pool_metrics)
+    dp.startup.register(start_render_pool)
 
     dp.message.middleware(DBSessionMiddleware(AsyncSessionFactory))
     dp.callback_query.middleware(DBSessionMiddleware(AsyncSessionFactory))
     logger.info("Database session middleware added")
+    dp.message.middleware(RenderResetMiddleware())
+    dp.callback_query.middleware(RenderResetMiddleware())
 
     dp.include_router(user_handlers.router)
     dp.include_router(shift_handlers.router)
@@ -27,6 +61,45 @@ async def main():
     dp.include_router(history.router)
     dp.include_router(in_developement.router)
     dp.include_router(statistics_handlers.router)
+    return dp
+
+async def shutdown(dp: Dispatcher, bot: Bot):
+    await message_renderer.flush_all()
+    await ephemeral_messages.shutdown()
+    await asyncio.to_thread(render_pool.shutdown)
+    await dp.storage.close()
+    await dispose_engine()
+    await bot.session.close()
+
+async def main():
+    bot = Bot(token=settings.telegram_bot_token)
+
+    if settings.run_mode == "supervisor":
+        # Workers build their own dispatchers; the parent only needs the update types its routers handle.
+        dp = create_dispatcher(MemoryStorage())
+        logger.info(f"Starting bot supervisor with {settings.workers} workers")
+        try:
+            await run_supervisor(bot, dp.resolve_used_update_types())
+        except Exception as e:
+            logger.error(f"Supervisor error: {e}", exc_info=True)
+        finally:
+            logger.info("Stopping bot supervisor")
+            await shutdown(dp, bot)
+            logger.info("Bot supervisor stopped")
+        return
+
+    dp = create_dispatcher()
+    if settings.run_mode == "webhook":
+        logger.info("Starting bot in webhook mode")
+        try:
+            await run_webhook(dp, bot)
+        except Exception as e:
+            logger.error(f"Webhook server error: {e}", exc_info=True)
+        finally:
+            logger.info("Stopping webhook server")
+            await shutdown(dp, bot)
+            logger.info("Webhook server stopped")
+        return
 
     logger.info("Starting bot polling")
     try:
@@ -35,9 +108,7 @@ async def main():
         logger.error(f"Bot polling error: {e}", exc_info=True)
     finally:
         logger.info("Stopping bot polling")
-        await dispose_engine()
-        await dp.storage.close()
-        await bot.session.close()
+        await shutdown(dp, bot)
         logger.info("Bot polling stopped")
 
 if __name__ == "__main__":
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,6 +12,58 @@ class Settings(BaseSettings):
     postgres_port: int
     postgres_db: str
 
+    replica_database_url: Optional[str] = None
+    replica_max_lag_seconds: float = 5.0
+    replica_health_check_interval: float = 10.0
+
+    db_profile: str = "direct"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_statement_cache_size: int = 100
+    db_prepared_statement_cache_size: int = 100
+    db_pool_metrics_interval: float = 60.0
+
+    run_mode: str = "polling"
+    webhook_base_url: Optional[str] = None
+    webhook_path: str = "/webhook"
+    webhook_secret: Optional[str] = None
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8080
+    webhook_max_in_flight: int = 100
+    webhook_max_body_size: int = 1024 * 1024
+    webhook_max_connections: int = 40
+    webhook_drain_timeout: float = 30.0
+
+    max_in_flight_updates: int = 64
+
+    # Every worker process opens its own DB engine, so Postgres can see up to
+    # workers * (db_pool_size + db_max_overflow) connections, plus the replica pool if configured.
+    workers: int = 2
+    worker_load_report_interval: float = 60.0
+    worker_stop_timeout: float = 30.0
+
+    render_backend: Literal["thread", "process"] = "thread"
+    render_workers: int = 2
+    render_max_queue: int = 8
+    statistics_image_cache_size: int = 512
+    statistics_image_format: str = "png"
+    statistics_image_quality: int = 85
+
+    active_shift_cache_size: int = 1024
+    active_shift_cache_events: int = 5
+    render_coalesce_delay: float = 0.7
+    ephemeral_message_delay: float = 3.0
+    ephemeral_batch_window: float = 0.5
+
+    fsm_storage: str = "postgres"
+    fsm_ttl_seconds: int = 14 * 24 * 3600
+    fsm_flush_interval: float = 0.5
+    fsm_cache_size: int = 2048
+    fsm_cache_ttl_seconds: float = 5.0
+
     @property
     def database_url(self) -> str:
         return f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
@@ -1,13 +1,88 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
-from typing import AsyncGenerator
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from dataclasses import dataclass
+from typing import AsyncGenerator, Any, Dict, Optional
+from uuid import uuid4
+import asyncio
 import logging
+import time
 
 from src.config import settings
+from src.db.middlewares.db import session_usage
 from src.db.models import Base
 
 logger = logging.getLogger(__name__)
 
-engine: AsyncEngine = create_async_engine(settings.database_url, echo=False, pool_size=5, max_overflow=10)
+
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    failures: int = 0
+
+    def record(self, wait: float):
+        self.checkouts += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def reset(self):
+        self.checkouts, self.total_wait, self.max_wait, self.failures = 0, 0.0, 0.0, 0
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    def connect(self):
+        # Measures the whole checkout: waiting for a free slot, opening overflow connections and pre-ping.
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except Exception:
+            pool_metrics.failures += 1
+            raise
+        finally:
+            pool_metrics.record(time.perf_counter() - started)
+
+
+def _engine_options() -> Dict[str, Any]:
+    options: Dict[str, Any] = {
+        "echo": False,
+        "poolclass": InstrumentedPool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "connect_args": {"statement_cache_size": settings.db_statement_cache_size},
+    }
+    if settings.db_profile == "pgbouncer":
+        # PgBouncer in transaction mode hands out a different server connection per transaction,
+        # so prepared statements must not be cached or reused by name.
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return options
+
+
+def _engine_url(database_url: str) -> URL:
+    prepared_statement_cache_size = 0 if settings.db_profile == "pgbouncer" else settings.db_prepared_statement_cache_size
+    return make_url(database_url).update_query_dict(
+        {"prepared_statement_cache_size": str(prepared_statement_cache_size)}
+    )
+
+
+engine: AsyncEngine = create_async_engine(_engine_url(settings.database_url), **_engine_options())
+
+replica_engine: Optional[AsyncEngine] = None
+if settings.replica_database_url:
+    replica_engine = create_async_engine(
+        _engine_url(settings.replica_database_url),
+        **{**_engine_options(), "poolclass": AsyncAdaptedQueuePool}
+    )
 
 AsyncSessionFactory = async_sessionmaker(
     engine,
@@ -17,6 +92,16 @@ AsyncSessionFactory = async_sessionmaker(
     class_=AsyncSession
 )
 
+ReplicaSessionFactory: Optional[async_sessionmaker] = None
+if replica_engine is not None:
+    ReplicaSessionFactory = async_sessionmaker(
+        replica_engine,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+        class_=AsyncSession
+    )
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionFactory() as session:
         try:
@@ -28,9 +113,53 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+def pool_status() -> Dict[str, Any]:
+    pool = engine.pool
+    average_wait = pool_metrics.total_wait / pool_metrics.checkouts if pool_metrics.checkouts else 0.0
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.db_max_overflow,
+        "checkouts": pool_metrics.checkouts,
+        "avg_wait_ms": round(average_wait * 1000, 2),
+        "max_wait_ms": round(pool_metrics.max_wait * 1000, 2),
+        "failed_checkouts": pool_metrics.failures,
+    }
+
+
+async def log_pool_metrics(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(f"DB pool: {pool_status()}")
+        logger.info(f"DB sessions: {session_usage.as_dict()}")
+        pool_metrics.reset()
+        session_usage.reset()
+
+
+_pool_metrics_task: Optional[asyncio.Task] = None
+
+
+async def start_pool_metrics():
+    global _pool_metrics_task
+    if settings.db_pool_metrics_interval > 0 and _pool_metrics_task is None:
+        _pool_metrics_task = asyncio.create_task(log_pool_metrics(settings.db_pool_metrics_interval))
+
+
+async def stop_pool_metrics():
+    global _pool_metrics_task
+    if _pool_metrics_task is not None:
+        _pool_metrics_task.cancel()
+        _pool_metrics_task = None
+        logger.info(f"DB pool: {pool_status()}")
+        logger.info(f"DB sessions: {session_usage.as_dict()}")
+
+
 async def dispose_engine():
     logger.info("Disposing engine")
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
     logger.info("Engine disposed")
 
 async def create_db_and_tables():
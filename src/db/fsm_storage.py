@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.db.models import FSMRecord
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CachedRecord:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+class PostgresStorage(BaseStorage):
+    def __init__(
+            self,
+            engine: AsyncEngine,
+            ttl: timedelta,
+            flush_interval: float = 0.5,
+            cache_size: int = 2048,
+            cache_ttl: float = 5.0,
+            eviction_interval: float = 3600.0,
+            key_builder: Optional[KeyBuilder] = None
+    ):
+        self.engine = engine
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.eviction_interval = eviction_interval
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._cache: "OrderedDict[str, _CachedRecord]" = OrderedDict()
+        self._dirty: Dict[str, _CachedRecord] = {}
+        self._flushing: Dict[str, _CachedRecord] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_eviction = 0.0
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._mark_dirty(self.key_builder.build(key), record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get_record(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise ValueError(f"Data must be a dict, got {type(data).__name__}")
+        record = await self._get_record(key)
+        record.data = data.copy()
+        self._mark_dirty(self.key_builder.build(key), record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._get_record(key)).data.copy()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._dirty:
+                return
+            pending, self._dirty = self._dirty, {}
+            self._flushing = pending
+            upserts = [
+                {"key": key, "state": record.state, "data": record.data}
+                for key, record in pending.items() if record.state is not None or record.data
+            ]
+            cleared = [key for key, record in pending.items() if record.state is None and not record.data]
+            try:
+                async with self.engine.begin() as conn:
+                    if upserts:
+                        stmt = pg_insert(FSMRecord).values(upserts)
+                        await conn.execute(stmt.on_conflict_do_update(
+                            index_elements=[FSMRecord.key],
+                            set_={"state": stmt.excluded.state, "data": stmt.excluded.data, "updated_at": func.now()}
+                        ))
+                    if cleared:
+                        await conn.execute(delete(FSMRecord).where(FSMRecord.key.in_(cleared)))
+            except Exception as e:
+                logger.error(f"Failed to flush {len(pending)} FSM records: {e}", exc_info=True)
+                for key, record in pending.items():
+                    self._dirty.setdefault(key, record)
+                return
+            finally:
+                self._flushing = {}
+            logger.debug(f"Flushed {len(upserts)} FSM records, cleared {len(cleared)}.")
+
+    async def evict_expired(self) -> int:
+        async with self.engine.begin() as conn:
+            result = await conn.execute(delete(FSMRecord).where(FSMRecord.updated_at < func.now() - self.ttl))
+        if result.rowcount:
+            logger.info(f"Evicted {result.rowcount} idle FSM records.")
+        return result.rowcount
+
+    async def _get_record(self, key: StorageKey) -> _CachedRecord:
+        storage_key = self.key_builder.build(key)
+        pending = self._dirty.get(storage_key) or self._flushing.get(storage_key)
+        record = pending or self._cache.get(storage_key)
+        # Other processes never invalidate this cache, so clean records are re-read after cache_ttl seconds. Only the
+        # supervisor's sticky routing keeps a user on one process; with webhook replicas, cache_ttl bounds the staleness.
+        if record is not None and (pending is not None or time.monotonic() - record.loaded_at < self.cache_ttl):
+            self._cache[storage_key] = record
+            self._cache.move_to_end(storage_key)
+            return record
+
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(
+                select(FSMRecord.state, FSMRecord.data).where(
+                    FSMRecord.key == storage_key,
+                    FSMRecord.updated_at >= func.now() - self.ttl
+                )
+            )).one_or_none()
+
+        record = _CachedRecord(state=row.state, data=dict(row.data or {})) if row else _CachedRecord()
+        self._cache[storage_key] = record
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return record
+
+    def _mark_dirty(self, storage_key: str, record: _CachedRecord):
+        record.loaded_at = time.monotonic()
+        self._dirty[storage_key] = record
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        # Writes are batched: every flush interval all changed keys go out in one upsert.
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if time.monotonic() - self._last_eviction >= self.eviction_interval:
+                self._last_eviction = time.monotonic()
+                try:
+                    await self.evict_expired()
+                except Exception as e:
+                    logger.error(f"Failed to evict idle FSM records: {e}", exc_info=True)
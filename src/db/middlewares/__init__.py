@@ -1,3 +1,3 @@
-from src.db.middlewares.db import DBSessionMiddleware
+from src.db.middlewares.db import DBSessionMiddleware, SessionUsageStats, session_usage
 
-__all__ = ["DBSessionMiddleware"]
\ No newline at end of file
+__all__ = ["DBSessionMiddleware", "SessionUsageStats", "session_usage"]
\ No newline at end of file
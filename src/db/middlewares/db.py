@@ -1,23 +1,81 @@
+from dataclasses import asdict, dataclass
 from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import Update
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session, sessionmaker
+from sqlalchemy.sql.selectable import CTE
 import logging
 
 logger = logging.getLogger(__name__)
 
+CHECKED_OUT_KEY = "db_checked_out"
+HAS_WRITES_KEY = "db_has_writes"
+
+
+@dataclass
+class SessionUsageStats:
+    updates_total: int = 0
+    updates_without_checkout: int = 0
+    read_only_updates: int = 0
+    commits: int = 0
+    failed_updates: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+    def reset(self):
+        self.updates_total = self.updates_without_checkout = self.read_only_updates = self.commits = self.failed_updates = 0
+
+
+session_usage = SessionUsageStats()
+
+
+@event.listens_for(Session, "after_begin")
+def _mark_checked_out(session: Session, transaction, connection):
+    session.info[CHECKED_OUT_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flushed(session: Session, flush_context):
+    session.info[HAS_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_writes(orm_execute_state: ORMExecuteState):
+    if not orm_execute_state.is_select or _has_ctes(orm_execute_state.statement):
+        # INSERT/UPDATE/DELETE, including data-modifying CTEs wrapped in a SELECT.
+        orm_execute_state.session.info[HAS_WRITES_KEY] = True
+
+
+def _has_ctes(statement) -> bool:
+    if getattr(statement, "_independent_ctes", ()):
+        return True
+    return any(isinstance(from_, CTE) for from_ in statement.get_final_froms())
+
+
 class DBSessionMiddleware(BaseMiddleware):
     def __init__(self, session_factory: sessionmaker):
         self.session_factory = session_factory
 
     async def __call__(self, handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]], event: Update, data: Dict[str, Any]) -> Any:
+        # AsyncSession only checks out a pooled connection on its first statement, so handlers that never use it cost nothing.
         async with self.session_factory() as session:
             try:
                 data["session"] = session
                 result = await handler(event, data)
-                await session.commit()
+                session_usage.updates_total += 1
+                if not session.sync_session.info.get(CHECKED_OUT_KEY):
+                    session_usage.updates_without_checkout += 1
+                elif session.sync_session.info.get(HAS_WRITES_KEY) or session.new or session.dirty or session.deleted:
+                    await session.commit()
+                    session_usage.commits += 1
+                else:
+                    session_usage.read_only_updates += 1
                 return result
             except Exception as e:
+                session_usage.updates_total += 1
+                session_usage.failed_updates += 1
                 await session.rollback()
                 logger.error(f"Database session error during request: {e}", exc_info=True)
                 raise
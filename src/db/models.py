@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, func, Float, BigInteger
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, func, Float, BigInteger, Date, Index, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, relationship, foreign
@@ -18,11 +18,12 @@ class User(Base):
     default_rate = Column(Float, nullable=False, default=0.0)
     default_order_rate = Column(Float, nullable=False, default=0.0)
     default_mileage_rate = Column(Float, nullable=False, default=0.0)
+    completed_shifts_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     shifts = relationship("Shift", primaryjoin="User.user_id == foreign(Shift.user_id)", back_populates="user")
 
     def __repr__(self):
-        return f"<User(id={self.id}, user_id={self.user_id}, username={self.username}, default_rate={self.default_rate}, default_order_rate={self.default_order_rate}, default_mileage_rate={self.default_mileage_rate})>"
+        return f"<User(id={self.id}, user_id={self.user_id}, username={self.username}, default_rate={self.default_rate}, default_order_rate={self.default_order_rate}, default_mileage_rate={self.default_mileage_rate}, completed_shifts_count={self.completed_shifts_count})>"
 
 class ShiftStatus(enum.Enum):
     FORMING = "forming"
@@ -49,6 +50,9 @@ class Shift(Base):
     total_mileage = Column(Float, nullable=False, default=0.0)
     total_tips = Column(Float, nullable=False, default=0.0)
     total_expenses = Column(Float, nullable=False, default=0.0)
+    food_expenses = Column(Float, nullable=False, default=0.0, server_default="0")
+    other_expenses = Column(Float, nullable=False, default=0.0, server_default="0")
+    net_profit = Column(Float, nullable=True)
     rate = Column(Float, nullable=False, default=0)
     order_rate = Column(Float, nullable=False, default=0)
     mileage_rate = Column(Float, nullable=False, default=0)
@@ -64,8 +68,13 @@ class Shift(Base):
         order_by="ShiftEvent.timestamp"
     )
 
+    __table_args__ = (
+        Index("uq_shifts_user_id_active", user_id, unique=True, postgresql_where=text("status = 'ACTIVE'")),
+        Index("ix_shifts_user_id_status_end_time", user_id, status, end_time.desc(), id.desc()),
+    )
+
     def __repr__(self):
-        return f"<Shift(id={self.id}, user_id={self.user_id}, status={self.status}, orders_count={self.orders_count}, total_mileage={self.total_mileage}, total_tips={self.total_tips}, total_expenses={self.total_expenses}, rate={self.rate}, order_rate={self.order_rate}, mileage_rate={self.mileage_rate}, start_time={self.start_time})>"
+        return f"<Shift(id={self.id}, user_id={self.user_id}, status={self.status}, orders_count={self.orders_count}, total_mileage={self.total_mileage}, total_tips={self.total_tips}, total_expenses={self.total_expenses}, food_expenses={self.food_expenses}, other_expenses={self.other_expenses}, net_profit={self.net_profit}, rate={self.rate}, order_rate={self.order_rate}, mileage_rate={self.mileage_rate}, start_time={self.start_time})>"
 
 class ShiftEvent(Base):
     __tablename__ = "shift_events"
@@ -75,8 +84,56 @@ class ShiftEvent(Base):
     event_type = Column(Enum(ShiftEventType), nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     details = Column(JSONB, nullable=True)
+    amount = Column(Float, nullable=True)
+    category_code = Column(String, nullable=True)
+    count = Column(Integer, nullable=True)
+    distance_km = Column(Float, nullable=True)
 
     shift = relationship("Shift", foreign_keys=[shift_id], back_populates="events")
 
+    __table_args__ = (
+        Index("ix_shift_events_shift_id_timestamp", shift_id, timestamp),
+    )
+
+    def __repr__(self):
+        return f"<ShiftEvent(id={self.id}, shift_id={self.shift_id}, type={self.event_type}, details={self.details}, timestamp={self.timestamp})>"
+
+class UserDailyStats(Base):
+    __tablename__ = "user_daily_stats"
+
+    user_id = Column(BigInteger, ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True)
+    stat_date = Column(Date, primary_key=True)
+    shifts_count = Column(Integer, nullable=False, default=0)
+    duration_seconds = Column(Float, nullable=False, default=0.0)
+    orders_count = Column(Integer, nullable=False, default=0)
+    total_mileage = Column(Float, nullable=False, default=0.0)
+    revenue_from_time = Column(Float, nullable=False, default=0.0)
+    revenue_from_orders = Column(Float, nullable=False, default=0.0)
+    total_tips = Column(Float, nullable=False, default=0.0)
+    food_expenses = Column(Float, nullable=False, default=0.0)
+    other_expenses = Column(Float, nullable=False, default=0.0)
+    mileage_cost = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<UserDailyStats(user_id={self.user_id}, stat_date={self.stat_date}, shifts_count={self.shifts_count}, orders_count={self.orders_count}, duration_seconds={self.duration_seconds})>"
+
+class FSMRecord(Base):
+    __tablename__ = "fsm_records"
+
+    key = Column(String, primary_key=True)
+    state = Column(String, nullable=True)
+    data = Column(JSONB, nullable=False, default=dict, server_default=text("'{}'::jsonb"))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<FSMRecord(key={self.key}, state={self.state}, updated_at={self.updated_at})>"
+
+class StatisticsImageCacheEntry(Base):
+    __tablename__ = "statistics_image_cache"
+
+    key = Column(String(64), primary_key=True)
+    file_id = Column(String, nullable=False)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
     def __repr__(self):
-        return f"<ShiftEvent(id={self.id}, shift_id={self.shift_id}, type={self.event_type}, details={self.details}, timestamp={self.timestamp})>"
\ No newline at end of file
+        return f"<StatisticsImageCacheEntry(key={self.key}, file_id={self.file_id}, last_used_at={self.last_used_at})>"
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import settings
+from src.db.engine import ReplicaSessionFactory
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+REPLICA_LAG_QUERY = text(
+    "SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END, 0)"
+)
+REPLICA_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+
+class ReplicaRouter:
+    def __init__(self, session_factory: Optional[async_sessionmaker], max_lag: float, health_check_interval: float):
+        self.session_factory = session_factory
+        self.max_lag = max_lag
+        self.health_check_interval = health_check_interval
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self._checked_at: Optional[float] = None
+        self._check_lock = asyncio.Lock()
+        self._recent_writes: Dict[int, float] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.session_factory is not None
+
+    def mark_primary_write(self, user_id: int):
+        # The replica may not have this write yet; keep the user's reads on the primary until it can have caught up.
+        now = time.monotonic()
+        self._recent_writes[user_id] = now + self.max_lag
+        if len(self._recent_writes) > 1024:
+            self._recent_writes = {uid: until for uid, until in self._recent_writes.items() if until > now}
+
+    async def run_read_only(self, primary_session: AsyncSession, user_id: int, fn: Callable[[AsyncSession], Awaitable[T]]) -> T:
+        if not await self._use_replica(user_id):
+            self.primary_fallbacks += 1
+            return await fn(primary_session)
+
+        try:
+            async with self.session_factory() as session:
+                result = await fn(session)
+            self.replica_reads += 1
+            return result
+        except REPLICA_ERRORS as e:
+            logger.warning(f"Replica read failed, falling back to primary: {e}")
+            self.healthy = False
+            self._checked_at = time.monotonic()
+            self.primary_fallbacks += 1
+            return await fn(primary_session)
+
+    async def _use_replica(self, user_id: int) -> bool:
+        if not self.enabled:
+            return False
+        until = self._recent_writes.get(user_id)
+        if until is not None:
+            if until > time.monotonic():
+                return False
+            del self._recent_writes[user_id]
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.health_check_interval:
+            await self._check_lag()
+        return self.healthy
+
+    async def _check_lag(self):
+        async with self._check_lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.health_check_interval:
+                return
+            try:
+                async with self.session_factory() as session:
+                    self.lag = float(await session.scalar(REPLICA_LAG_QUERY))
+                self.healthy = self.lag <= self.max_lag
+                if not self.healthy:
+                    logger.warning(f"Replica lags {self.lag:.1f}s behind primary, reading from primary.")
+            except REPLICA_ERRORS as e:
+                logger.warning(f"Replica health check failed, reading from primary: {e}")
+                self.lag = None
+                self.healthy = False
+            self._checked_at = time.monotonic()
+
+
+replica_router = ReplicaRouter(ReplicaSessionFactory, settings.replica_max_lag_seconds, settings.replica_health_check_interval)
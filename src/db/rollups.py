@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import select, delete, insert, update, func, cast, Date
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.engine import AsyncSessionFactory, dispose_engine
+from src.db.models import Shift, ShiftStatus, User, UserDailyStats
+from src.db.statistics import PeriodTotals, TOTALS_FIELDS, shift_totals_columns, local_stat_date
+
+logger = logging.getLogger(__name__)
+
+
+async def _apply_shift_delta(session: AsyncSession, shift: Shift, sign: int):
+    totals = PeriodTotals.from_shift(shift)
+    values = {name: getattr(totals, name) * sign for name in TOTALS_FIELDS}
+    stat_date = local_stat_date(shift.end_time)
+
+    stmt = pg_insert(UserDailyStats).values(user_id=shift.user_id, stat_date=stat_date, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserDailyStats.user_id, UserDailyStats.stat_date],
+        set_={name: getattr(UserDailyStats, name) + stmt.excluded[name] for name in TOTALS_FIELDS}
+    )
+    await session.execute(stmt)
+    return stat_date
+
+
+async def _adjust_completed_shifts_count(session: AsyncSession, user_id: int, delta: int):
+    await session.execute(
+        update(User).where(User.user_id == user_id).values(
+            completed_shifts_count=func.greatest(User.completed_shifts_count + delta, 0)
+        ).execution_options(synchronize_session=False)
+    )
+
+
+async def apply_completed_shift(session: AsyncSession, shift: Shift):
+    if shift.status != ShiftStatus.COMPLETED or not shift.end_time:
+        return
+    stat_date = await _apply_shift_delta(session, shift, 1)
+    await _adjust_completed_shifts_count(session, shift.user_id, 1)
+    logger.info(f"Added shift {shift.id} to daily stats of user {shift.user_id} for {stat_date}.")
+
+
+async def revert_completed_shift(session: AsyncSession, shift: Shift):
+    if shift.status != ShiftStatus.COMPLETED or not shift.end_time:
+        return
+    stat_date = await _apply_shift_delta(session, shift, -1)
+    await _adjust_completed_shifts_count(session, shift.user_id, -1)
+    await session.execute(delete(UserDailyStats).where(
+        UserDailyStats.user_id == shift.user_id,
+        UserDailyStats.stat_date == stat_date,
+        UserDailyStats.shifts_count <= 0
+    ))
+    logger.info(f"Removed shift {shift.id} from daily stats of user {shift.user_id} for {stat_date}.")
+
+
+async def rebuild_daily_stats(session: AsyncSession, user_id: Optional[int] = None) -> int:
+    stat_date = cast(func.timezone("Europe/Moscow", Shift.end_time), Date)
+
+    delete_stmt = delete(UserDailyStats)
+    source_stmt = select(Shift.user_id, stat_date.label("stat_date"), *shift_totals_columns()).where(
+        Shift.status == ShiftStatus.COMPLETED,
+        Shift.end_time.is_not(None)
+    ).group_by(Shift.user_id, stat_date)
+
+    completed_count = select(func.count(Shift.id)).where(
+        Shift.user_id == User.user_id,
+        Shift.status == ShiftStatus.COMPLETED
+    ).scalar_subquery()
+    count_stmt = update(User).values(completed_shifts_count=completed_count).execution_options(synchronize_session=False)
+
+    if user_id is not None:
+        delete_stmt = delete_stmt.where(UserDailyStats.user_id == user_id)
+        source_stmt = source_stmt.where(Shift.user_id == user_id)
+        count_stmt = count_stmt.where(User.user_id == user_id)
+
+    await session.execute(delete_stmt)
+    result = await session.execute(
+        insert(UserDailyStats).from_select(["user_id", "stat_date", *TOTALS_FIELDS], source_stmt)
+    )
+    await session.execute(count_stmt)
+    logger.info(f"Rebuilt {result.rowcount} daily stats rows" + (f" for user {user_id}." if user_id is not None else "."))
+    return result.rowcount
+
+
+async def _run_rebuild(user_id: Optional[int]):
+    try:
+        async with AsyncSessionFactory() as session:
+            await rebuild_daily_stats(session, user_id)
+            await session.commit()
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Maintain the user_daily_stats rollups and completed shift counters.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Recompute daily rollups and counters from shifts.")
+    rebuild_parser.add_argument("--user-id", type=int, default=None, help="Telegram user id to rebuild (default: all users).")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        asyncio.run(_run_rebuild(args.user_id))
@@ -0,0 +1,88 @@
+import logging
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Row, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Shift, ShiftEvent, ShiftEventType, ShiftStatus
+
+logger = logging.getLogger(__name__)
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+
+
+def round_count(value: Any) -> int:
+    # Same as round(numeric) in the backfill migration: halves go away from zero, not to even.
+    return int(Decimal(str(value)).to_integral_value(ROUND_HALF_UP))
+
+
+TYPED_EVENT_FIELDS = {"amount": float, "category_code": str, "count": round_count, "distance_km": float}
+
+
+def typed_event_values(event_type: ShiftEventType, details: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    details = details or {}
+    values = {
+        name: cast(details[name]) if details.get(name) is not None else None
+        for name, cast in TYPED_EVENT_FIELDS.items()
+    }
+    if event_type == ShiftEventType.ADD_EXPENSE and values["category_code"] is None:
+        # Expenses without a category are counted as "other" everywhere, so the column says so too.
+        values["category_code"] = "other"
+    return values
+
+
+def active_shift_mutation(
+        user_id: int,
+        increments: Optional[Dict[str, float]] = None,
+        assignments: Optional[Dict[str, Any]] = None,
+        event_type: Optional[ShiftEventType] = None,
+        event_details: Optional[Dict[str, Any]] = None,
+        event_timestamp: Optional[datetime] = None
+):
+    values = {getattr(Shift, name): getattr(Shift, name) + value for name, value in (increments or {}).items()}
+    values.update({getattr(Shift, name): value for name, value in (assignments or {}).items()})
+
+    updated_shift = update(Shift).where(
+        Shift.user_id == user_id,
+        Shift.status == ShiftStatus.ACTIVE
+    ).values(values).returning(*Shift.__table__.c).cte("updated_shift")
+    stmt = select(updated_shift)
+
+    if event_type is not None:
+        events = ShiftEvent.__table__
+        typed_values = typed_event_values(event_type, event_details)
+        inserted_event = insert(events).from_select(
+            ["shift_id", "event_type", "details", "timestamp", *typed_values],
+            select(
+                updated_shift.c.id,
+                literal(event_type, events.c.event_type.type),
+                literal(event_details, events.c.details.type),
+                literal(event_timestamp, events.c.timestamp.type),
+                *(literal(value, events.c[name].type) for name, value in typed_values.items())
+            )
+        ).cte("inserted_event")
+        stmt = stmt.add_cte(inserted_event)
+
+    return stmt
+
+
+async def mutate_active_shift(
+        session: AsyncSession,
+        user_id: int,
+        increments: Optional[Dict[str, float]] = None,
+        assignments: Optional[Dict[str, Any]] = None,
+        event_type: Optional[ShiftEventType] = None,
+        event_details: Optional[Dict[str, Any]] = None,
+        event_timestamp: Optional[datetime] = None
+) -> Optional[Row]:
+    # One round-trip: the counters are incremented in SQL and the event is inserted from the UPDATE's RETURNING rows.
+    stmt = active_shift_mutation(
+        user_id, increments, assignments, event_type, event_details,
+        event_timestamp or datetime.now(MOSCOW_TZ)
+    )
+    row = (await session.execute(stmt)).one_or_none()
+    if row is None:
+        logger.warning(f"No active shift to update for user {user_id}.")
+    return row
@@ -0,0 +1,121 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, date
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Shift, UserDailyStats
+from src.utils.statistics_config import TAX_RATE
+
+logger = logging.getLogger(__name__)
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+
+
+TOTALS_FIELDS = [
+    "shifts_count", "duration_seconds", "orders_count", "total_mileage", "revenue_from_time",
+    "revenue_from_orders", "total_tips", "food_expenses", "other_expenses", "mileage_cost",
+]
+
+
+@dataclass(frozen=True)
+class PeriodTotals:
+    shifts_count: int = 0
+    duration_seconds: float = 0.0
+    orders_count: int = 0
+    total_mileage: float = 0.0
+    revenue_from_time: float = 0.0
+    revenue_from_orders: float = 0.0
+    total_tips: float = 0.0
+    food_expenses: float = 0.0
+    other_expenses: float = 0.0
+    mileage_cost: float = 0.0
+
+    @classmethod
+    def from_shift(cls, shift: Shift, end_time: Optional[datetime] = None) -> "PeriodTotals":
+        end_time = end_time or shift.end_time
+        duration_seconds = 0.0
+        if shift.start_time and end_time:
+            duration_seconds = max((end_time - shift.start_time).total_seconds(), 0.0)
+
+        orders_count = shift.orders_count or 0
+        total_mileage = shift.total_mileage or 0.0
+        return cls(
+            shifts_count=1,
+            duration_seconds=duration_seconds,
+            orders_count=orders_count,
+            total_mileage=total_mileage,
+            revenue_from_time=duration_seconds / 3600.0 * (shift.rate or 0.0),
+            revenue_from_orders=orders_count * (shift.order_rate or 0.0),
+            total_tips=shift.total_tips or 0.0,
+            food_expenses=shift.food_expenses or 0.0,
+            other_expenses=shift.other_expenses or 0.0,
+            mileage_cost=total_mileage * (shift.mileage_rate or 0.0),
+        )
+
+    @classmethod
+    def from_row(cls, row) -> "PeriodTotals":
+        mapping = row._mapping
+        return cls(**{
+            name: int(mapping[name]) if name in ("shifts_count", "orders_count") else float(mapping[name])
+            for name in TOTALS_FIELDS
+        })
+
+    @property
+    def duration_hours(self) -> float:
+        return self.duration_seconds / 3600.0
+
+    @property
+    def gross_income(self) -> float:
+        return self.revenue_from_time + self.revenue_from_orders + self.total_tips
+
+    @property
+    def tax_amount(self) -> float:
+        return self.gross_income * TAX_RATE
+
+    @property
+    def operational_expenses(self) -> float:
+        return self.food_expenses + self.other_expenses + self.mileage_cost
+
+    @property
+    def net_profit(self) -> float:
+        return self.gross_income - self.operational_expenses - self.tax_amount
+
+
+def shift_totals_columns() -> list:
+    duration_seconds = func.greatest(func.extract("epoch", Shift.end_time - Shift.start_time), 0.0)
+    return [
+        func.count(Shift.id).label("shifts_count"),
+        func.coalesce(func.sum(duration_seconds), 0.0).label("duration_seconds"),
+        func.coalesce(func.sum(Shift.orders_count), 0).label("orders_count"),
+        func.coalesce(func.sum(Shift.total_mileage), 0.0).label("total_mileage"),
+        func.coalesce(func.sum(duration_seconds / 3600.0 * func.coalesce(Shift.rate, 0.0)), 0.0).label("revenue_from_time"),
+        func.coalesce(func.sum(Shift.orders_count * func.coalesce(Shift.order_rate, 0.0)), 0.0).label("revenue_from_orders"),
+        func.coalesce(func.sum(Shift.total_tips), 0.0).label("total_tips"),
+        func.coalesce(func.sum(Shift.food_expenses), 0.0).label("food_expenses"),
+        func.coalesce(func.sum(Shift.other_expenses), 0.0).label("other_expenses"),
+        func.coalesce(func.sum(Shift.total_mileage * func.coalesce(Shift.mileage_rate, 0.0)), 0.0).label("mileage_cost"),
+    ]
+
+
+def local_stat_date(moment: datetime) -> date:
+    if moment.tzinfo is None:
+        return moment.date()
+    return moment.astimezone(MOSCOW_TZ).date()
+
+
+async def get_period_totals(session: AsyncSession, user_id: int, start_date: datetime, end_date: datetime) -> PeriodTotals:
+    # Periods are whole Moscow days, so summing the daily rollups equals filtering shifts by end_time.
+    stmt = select(
+        *[func.coalesce(func.sum(getattr(UserDailyStats, name)), 0).label(name) for name in TOTALS_FIELDS]
+    ).where(
+        UserDailyStats.user_id == user_id,
+        UserDailyStats.stat_date >= local_stat_date(start_date),
+        UserDailyStats.stat_date <= local_stat_date(end_date)
+    )
+
+    row = (await session.execute(stmt)).one()
+    logger.debug(f"Period totals for user {user_id} ({start_date} - {end_date}): {row}")
+    return PeriodTotals.from_row(row)
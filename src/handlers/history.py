@@ -1,18 +1,28 @@
 import logging
-from typing import Union
+import os
+import tempfile
+from typing import List, Optional, Tuple, Union
 from zoneinfo import ZoneInfo
 
 from aiogram import Router, F
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, Message
-from sqlalchemy import select, func
+from aiogram.types import CallbackQuery, FSInputFile, Message
+from sqlalchemy import select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from src.db.models import Shift, ShiftStatus
-from src.keyboards.history import history_selection_keyboard, shift_details_keyboard, confirm_delete_shift_keyboard
+from src.db.models import Shift, ShiftStatus, User
+from src.db.replica import replica_router
+from src.db.rollups import revert_completed_shift
+from src.keyboards.history import (
+    history_selection_keyboard, shift_details_keyboard, confirm_delete_shift_keyboard,
+    HistoryCursor, encode_history_cursor, decode_history_cursor, import_prompt_keyboard
+)
 from src.states import MenuStates
+from src.utils.active_shift_cache import active_shift_cache
 from src.utils.formatters import format_completed_shift_details_message
+from src.utils.shift_export import EXPORT_FORMATS, export_shift_history
+from src.utils.shift_import import IMPORT_MAX_FILE_SIZE, ShiftImportError, import_shifts
 from src.utils.text_manager import text_manager as tm
 
 logger = logging.getLogger(__name__)
@@ -21,54 +31,82 @@ router = Router()
 HISTORY_PAGE_SIZE = 6
 MOSCOW_TZ = ZoneInfo("Europe/Moscow")
 
-async def show_history_page(call_or_message: Union[CallbackQuery, Message],state: FSMContext,session: AsyncSession,page: int = 1):
-    user_id = call_or_message.from_user.id
-    logger.info(f"User {user_id} requested history page {page}.")
+async def _load_history_page(session: AsyncSession, user_id: int, cursor: Optional[HistoryCursor]) -> Tuple[int, List[Shift]]:
+    total_shifts_count = await session.scalar(select(User.completed_shifts_count).where(User.user_id == user_id))
+
+    stmt = select(Shift).where(
+        Shift.user_id == user_id,
+        Shift.status == ShiftStatus.COMPLETED
+    )
+    if cursor is None:
+        stmt = stmt.order_by(Shift.end_time.desc(), Shift.id.desc()).limit(HISTORY_PAGE_SIZE + 1)
+    else:
+        direction, cursor_end_time, cursor_shift_id = cursor
+        shift_key = tuple_(Shift.end_time, Shift.id)
+        cursor_key = tuple_(cursor_end_time, cursor_shift_id)
+        if direction == "b":
+            stmt = stmt.where(shift_key > cursor_key).order_by(Shift.end_time.asc(), Shift.id.asc()).limit(HISTORY_PAGE_SIZE)
+        else:
+            stmt = stmt.where(
+                shift_key < cursor_key if direction == "a" else shift_key <= cursor_key
+            ).order_by(Shift.end_time.desc(), Shift.id.desc()).limit(HISTORY_PAGE_SIZE + 1)
+
+    result = await session.execute(stmt)
+    return total_shifts_count or 0, list(result.scalars().all())
 
-    await state.update_data(history_current_page=page)
 
-    count_stmt = select(func.count(Shift.id)).where(
+async def _load_completed_shift(session: AsyncSession, user_id: int, shift_id: int) -> Optional[Shift]:
+    stmt = select(Shift).where(
+        Shift.id == shift_id,
         Shift.user_id == user_id,
         Shift.status == ShiftStatus.COMPLETED
+    ).options(selectinload(Shift.events), selectinload(Shift.user))
+    return await session.scalar(stmt)
+
+
+async def show_history_page(call_or_message: Union[CallbackQuery, Message],state: FSMContext,session: AsyncSession,page: int = 1, cursor: Optional[HistoryCursor] = None):
+    user_id = call_or_message.from_user.id
+    logger.info(f"User {user_id} requested history page {page}.")
+
+    if cursor is None or page <= 1:
+        page, cursor = 1, None
+
+    total_shifts_count, shifts = await replica_router.run_read_only(
+        session, user_id, lambda read_session: _load_history_page(read_session, user_id, cursor)
     )
-    total_shifts_count_result = await session.execute(count_stmt)
-    total_shifts_count = total_shifts_count_result.scalar_one_or_none()
-    if total_shifts_count is None:
-        total_shifts_count = 0
 
     total_pages = (total_shifts_count + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE
     if total_pages == 0:
         total_pages = 1
 
-    page = max(1, min(page, total_pages))
-    await state.update_data(history_current_page=page)
-    offset = (page - 1) * HISTORY_PAGE_SIZE
+    if cursor is not None and cursor[0] == "b":
+        shifts.reverse()
+        has_next_page = True
+        if len(shifts) < HISTORY_PAGE_SIZE:
+            # Pages drifted after a deletion, restart from the newest shifts.
+            await show_history_page(call_or_message, state, session)
+            return
+    else:
+        has_next_page = len(shifts) > HISTORY_PAGE_SIZE
+        shifts = shifts[:HISTORY_PAGE_SIZE]
 
-    stmt = select(Shift).where(
-        Shift.user_id == user_id,
-        Shift.status == ShiftStatus.COMPLETED
-    ).options(
-        selectinload(Shift.events),
-        selectinload(Shift.user)
-    ).order_by(Shift.end_time.desc()).offset(offset).limit(HISTORY_PAGE_SIZE)
+    if not shifts and cursor is not None:
+        await show_history_page(call_or_message, state, session)
+        return
 
-    result = await session.execute(stmt)
-    shifts = result.scalars().all()
+    total_pages = max(total_pages, page + 1 if has_next_page else page)
+    await state.update_data(
+        history_current_page=page,
+        history_current_cursor=encode_history_cursor("c", shifts[0]) if cursor is not None else None
+    )
 
     message_text: str
-    if not shifts and page == 1:
+    if not shifts:
         message_text = tm.get("history.no_shifts_found")
-    elif not shifts and page > 1:
-        if total_shifts_count > 0 and page > 1:
-            page = max(1, page - 1)
-            await show_history_page(call_or_message, state, session, page=page)
-            return
-        else:
-            message_text = tm.get("history.no_shifts_found")
     else:
         message_text = tm.get("history.title")
 
-    reply_markup = history_selection_keyboard(shifts, page, total_pages)
+    reply_markup = history_selection_keyboard(shifts, page, total_pages, has_next_page)
 
     target_message = None
     if isinstance(call_or_message, CallbackQuery):
@@ -91,6 +129,13 @@ async def show_history_page(call_or_message: Union[CallbackQuery, Message],state
     await state.set_state(MenuStates.in_history)
 
 
+async def show_current_history_page(call_or_message: Union[CallbackQuery, Message], state: FSMContext, session: AsyncSession):
+    data = await state.get_data()
+    cursor_token = data.get("history_current_cursor")
+    cursor = decode_history_cursor(cursor_token.split(":")) if cursor_token else None
+    await show_history_page(call_or_message, state, session, page=data.get("history_current_page", 1), cursor=cursor)
+
+
 @router.callback_query(F.data == "main_menu:history", MenuStates.in_main_menu)
 async def handle_work_history_menu_entry(call: CallbackQuery, state: FSMContext, session: AsyncSession):
     await show_history_page(call, state, session, page=1)
@@ -104,10 +149,12 @@ async def handle_history_page_navigation(call: CallbackQuery, state: FSMContext,
         return
     try:
         page = int(data_parts[2])
-        await show_history_page(call, state, session, page=page)
+        cursor = decode_history_cursor(data_parts[3:]) if len(data_parts) > 3 else None
     except ValueError:
         logger.error(f"Invalid page number in callback data: {call.data}")
         await call.answer("Ошибка навигации.", show_alert=True)
+        return
+    await show_history_page(call, state, session, page=page, cursor=cursor)
 
 
 @router.callback_query(F.data.startswith("history:shift:"), MenuStates.in_history)
@@ -122,28 +169,20 @@ async def handle_select_shift_from_history(call: CallbackQuery, state: FSMContex
     user_id = call.from_user.id
     logger.info(f"User {user_id} selected shift {shift_id} from history.")
 
-    stmt = select(Shift).where(
-        Shift.id == shift_id,
-        Shift.user_id == user_id,
-        Shift.status == ShiftStatus.COMPLETED
-    ).options(selectinload(Shift.events), selectinload(Shift.user))
-
-    shift = await session.scalar(stmt)
+    shift = await replica_router.run_read_only(
+        session, user_id, lambda read_session: _load_completed_shift(read_session, user_id, shift_id)
+    )
 
     if not shift:
         logger.warning(f"Shift {shift_id} not found or not accessible for user {user_id}.")
         await call.answer("Ошибка: Смена не найдена или недоступна.", show_alert=True)
-        current_data = await state.get_data()
-        last_page = current_data.get("history_last_page", 1)
-        await show_history_page(call, state, session, page=last_page)
+        await show_current_history_page(call, state, session)
         return
 
     if not shift.end_time:
         logger.error(f"Shift {shift_id} is COMPLETED but has no end_time.")
         await call.answer("Ошибка: Данные смены неполные.", show_alert=True)
-        current_data = await state.get_data()
-        last_page = current_data.get("history_last_page", 1)
-        await show_history_page(call, state, session, page=last_page)
+        await show_current_history_page(call, state, session)
         return
 
     message_text = await format_completed_shift_details_message(shift)
@@ -153,11 +192,96 @@ async def handle_select_shift_from_history(call: CallbackQuery, state: FSMContex
         await call.message.edit_text(text=message_text, reply_markup=reply_markup, parse_mode="HTML")
     await call.answer()
 
+@router.callback_query(F.data.startswith("history:export:"), MenuStates.in_history)
+async def handle_export_history(call: CallbackQuery, session: AsyncSession):
+    export_format = call.data.split(":")[-1]
+    if export_format not in EXPORT_FORMATS:
+        await call.answer()
+        return
+
+    user_id = call.from_user.id
+    logger.info(f"User {user_id} requested a {export_format} export of their shifts.")
+    await call.answer(tm.get("history.export_preparing"))
+
+    try:
+        path = await replica_router.run_read_only(
+            session, user_id, lambda read_session: export_shift_history(read_session, user_id, export_format)
+        )
+    except Exception as e:
+        logger.error(f"Failed to export shifts for user {user_id}: {e}", exc_info=True)
+        await call.message.answer(tm.get("history.export_failed"))
+        return
+
+    if path is None:
+        await call.message.answer(tm.get("history.no_shifts_found"))
+        return
+
+    try:
+        await call.message.answer_document(
+            FSInputFile(path, filename=f"shifts.{export_format}"),
+            caption=tm.get("history.export_caption")
+        )
+    finally:
+        os.unlink(path)
+
+
+@router.callback_query(F.data == "history:import", MenuStates.in_history)
+async def prompt_import_history(call: CallbackQuery, state: FSMContext):
+    await call.message.edit_text(text=tm.get("history.import_prompt"), reply_markup=import_prompt_keyboard(), parse_mode="HTML")
+    await state.set_state(MenuStates.waiting_for_import_file)
+    await call.answer()
+
+
+@router.callback_query(F.data == "history:import_cancel", MenuStates.waiting_for_import_file)
+async def cancel_import_history(call: CallbackQuery, state: FSMContext, session: AsyncSession):
+    await show_current_history_page(call, state, session)
+
+
+@router.message(MenuStates.waiting_for_import_file, F.document)
+async def handle_import_file(message: Message, state: FSMContext, session: AsyncSession):
+    user_id = message.from_user.id
+    document = message.document
+    if document.file_size and document.file_size > IMPORT_MAX_FILE_SIZE:
+        await message.answer(tm.get("history.import_too_large", max_size_mb=IMPORT_MAX_FILE_SIZE // (1024 * 1024)))
+        return
+
+    logger.info(f"User {user_id} uploaded {document.file_name} ({document.file_size} bytes) for import.")
+    await message.answer(tm.get("history.import_in_progress"))
+
+    fd, path = tempfile.mkstemp(prefix=f"import_{user_id}_", suffix=".csv")
+    os.close(fd)
+    try:
+        await message.bot.download(document, destination=path)
+        imported, skipped = await import_shifts(session, user_id, path)
+        await session.commit()
+    except ShiftImportError as e:
+        await message.answer(tm.get("history.import_invalid", errors="\n".join(e.errors)))
+        return
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"Failed to import shifts for user {user_id}: {e}", exc_info=True)
+        await message.answer(tm.get("history.import_failed"))
+        return
+    finally:
+        os.unlink(path)
+
+    if imported:
+        replica_router.mark_primary_write(user_id)
+    done_text = tm.get("history.import_done", count=imported)
+    if skipped:
+        done_text += "\n" + tm.get("history.import_skipped", count=skipped)
+    await message.answer(done_text)
+    await show_history_page(message, state, session)
+
+
+@router.message(MenuStates.waiting_for_import_file)
+async def handle_import_expects_file(message: Message):
+    await message.answer(tm.get("history.import_expects_file"), reply_markup=import_prompt_keyboard())
+
+
 @router.callback_query(F.data == "main_menu:history", MenuStates.in_history)
 async def back_to_history_list(call: CallbackQuery, state: FSMContext, session: AsyncSession):
-    current_data = await state.get_data()
-    page_to_return = current_data.get("history_last_page_for_details", 1)
-    await show_history_page(call, state, session, page=page_to_return)
+    await show_current_history_page(call, state, session)
 
 @router.callback_query(F.data.startswith("history:delete_shift_prompt:"), MenuStates.in_history)
 async def prompt_delete_shift_confirmation(call: CallbackQuery, state: FSMContext, session: AsyncSession):
@@ -195,9 +319,7 @@ async def confirm_delete_shift(call: CallbackQuery, state: FSMContext, session:
     except (ValueError, IndexError):
         logger.error(f"Invalid shift_id in delete confirm callback: {call.data}")
         await call.answer("Ошибка при подтверждении удаления.", show_alert=True)
-        current_data = await state.get_data()
-        page = current_data.get("history_current_page", 1)
-        await show_history_page(call, state, session, page=page)
+        await show_current_history_page(call, state, session)
         return
 
     data = await state.get_data()
@@ -206,8 +328,7 @@ async def confirm_delete_shift(call: CallbackQuery, state: FSMContext, session:
     if shift_id_from_callback != shift_id_from_state:
         logger.error(f"Shift ID mismatch: callback {shift_id_from_callback}, state {shift_id_from_state}")
         await call.answer("Ошибка: несоответствие ID смены для удаления.", show_alert=True)
-        page = data.get("history_current_page", 1)
-        await show_history_page(call, state, session, page=page)
+        await show_current_history_page(call, state, session)
         return
 
     shift_to_delete = await session.get(Shift, shift_id_from_state)
@@ -215,13 +336,15 @@ async def confirm_delete_shift(call: CallbackQuery, state: FSMContext, session:
     if not shift_to_delete or shift_to_delete.user_id != call.from_user.id:
         await call.answer(tm.get("history.shift_not_found_for_deletion"), show_alert=True)
     else:
+        await revert_completed_shift(session, shift_to_delete)
         await session.delete(shift_to_delete)
         await session.commit()
+        active_shift_cache.invalidate(call.from_user.id)
+        replica_router.mark_primary_write(call.from_user.id)
         logger.info(f"User {call.from_user.id} deleted shift {shift_id_from_state}.")
         await call.answer(tm.get("history.shift_deleted_successfully"), show_alert=False)
 
-    page = data.get("history_current_page", 1)
-    await show_history_page(call, state, session, page=page)
+    await show_current_history_page(call, state, session)
     await state.set_state(MenuStates.in_history)
 
 @router.callback_query(F.data.startswith("history:delete_shift_cancel:"), MenuStates.confirming_shift_deletion)
@@ -231,9 +354,7 @@ async def cancel_delete_shift(call: CallbackQuery, state: FSMContext, session: A
     except (ValueError, IndexError):
         logger.error(f"Invalid shift_id in delete cancel callback: {call.data}")
         await call.answer("Ошибка при отмене удаления.", show_alert=True)
-        current_data = await state.get_data()
-        page = current_data.get("history_current_page", 1)
-        await show_history_page(call, state, session, page=page)
+        await show_current_history_page(call, state, session)
         return
 
     await call.answer(tm.get("history.shift_deletion_cancelled"))
@@ -251,9 +372,7 @@ async def cancel_delete_shift(call: CallbackQuery, state: FSMContext, session: A
     if not shift:
         logger.warning(f"Shift {shift_id} not found after cancel delete for user {call.from_user.id}.")
         await call.answer("Ошибка: Смена не найдена.", show_alert=True)
-        current_data = await state.get_data()
-        last_page = current_data.get("history_current_page", 1)
-        await show_history_page(call, state, session, page=last_page)
+        await show_current_history_page(call, state, session)
         return
 
     message_text = await format_completed_shift_details_message(shift)
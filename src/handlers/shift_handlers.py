@@ -1,5 +1,4 @@
 import logging
-import asyncio
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from typing import Union, Dict, Any, Optional
@@ -7,11 +6,15 @@ from typing import Union, Dict, Any, Optional
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from src.db.models import Shift, ShiftStatus, ShiftEvent, ShiftEventType, User
+from src.db.rollups import apply_completed_shift
+from src.db.replica import replica_router
+from src.db.statistics import PeriodTotals
 from src.keyboards.shift import (
     active_shift_keyboard, mileage_keyboard, tips_keyboard,
     cancel_action_keyboard, expenses_category_keyboard,
@@ -20,6 +23,10 @@ from src.keyboards.shift import (
 from src.keyboards.main_menu import main_menu_keyboard
 from src.states.shift import ShiftStates
 from src.states.menu import MenuStates
+from src.utils.active_shift_cache import (
+    ActiveShiftSnapshot, active_shift_cache, load_active_shift_snapshot, write_active_shift
+)
+from src.utils.ephemeral import ephemeral_messages
 from src.utils.formatters import get_active_shift_message_text
 from src.handlers.user_handlers import get_or_create_user
 from src.utils.text_manager import text_manager
@@ -34,36 +41,38 @@ async def _update_shift_value_and_event(
         shift_field_name: str,
         event_type: ShiftEventType,
         event_details: Dict[str, Any]
-) -> Optional[Shift]:
-    stmt = select(Shift).where(
-        Shift.user_id == user_id,
-        Shift.status == ShiftStatus.ACTIVE
-    ).options(selectinload(Shift.events))
-    shift = await session.scalar(stmt)
+) -> Optional[ActiveShiftSnapshot]:
+    increments = {shift_field_name: value_to_add}
 
+    if event_type == ShiftEventType.ADD_EXPENSE:
+        category_code = event_details.get("category_code", "other")
+        if category_code == "food":
+            increments["food_expenses"] = value_to_add
+        elif category_code == "other":
+            increments["other_expenses"] = value_to_add
+
+    shift = await write_active_shift(session, user_id, increments=increments, event_type=event_type, event_details=event_details)
     if not shift:
         logger.error(f"No active shift found for user {user_id} during value update.")
-        return None
+    return shift
 
-    current_value = getattr(shift, shift_field_name, 0.0)
-    setattr(shift, shift_field_name, current_value + value_to_add)
 
-    new_event = ShiftEvent(
-        event_type=event_type,
-        details=event_details,
-        timestamp=datetime.now(ZoneInfo('Europe/Moscow'))
+async def _set_shift_mileage(session: AsyncSession, user_id: int, mileage_value: float, description: str) -> Optional[ActiveShiftSnapshot]:
+    shift = await write_active_shift(
+        session, user_id,
+        assignments={"total_mileage": mileage_value},
+        event_type=ShiftEventType.ADD_MILEAGE,
+        event_details={"distance_km": mileage_value, "description": description}
     )
-    new_event.shift = shift
-
-    session.add(shift)
-    session.add(new_event)
+    if not shift:
+        logger.error(f"No active shift found for user {user_id} during mileage update.")
     return shift
 
 
 async def _return_to_active_shift_view(
         target: Union[Message, CallbackQuery],
         state: FSMContext,
-        shift: Shift,
+        shift: Union[Shift, ActiveShiftSnapshot],
         answer_text: Optional[str] = None
 ):
     data = await state.get_data()
@@ -185,14 +194,25 @@ async def _create_new_shift(session: AsyncSession, user_telegram_id: int, user_t
         timestamp=start_time_dt
     )
     start_event.shift = new_shift
-    session.add(new_shift)
-    session.add(start_event)
 
-    await session.flush()
+    try:
+        async with session.begin_nested():
+            session.add(new_shift)
+            session.add(start_event)
+    except IntegrityError:
+        # uq_shifts_user_id_active: a concurrent update already started a shift for this user.
+        logger.warning(f"User {user_db.user_id} already has an active shift, resuming it instead of creating a new one.")
+        existing_shift = await session.scalar(select(Shift).where(
+            Shift.user_id == user_db.user_id,
+            Shift.status == ShiftStatus.ACTIVE
+        ).options(selectinload(Shift.events)))
+        return existing_shift, text_manager.get("shift.already_active", "У вас уже есть активная смена.")
+
     if new_shift.id is None:
         await session.refresh(new_shift)
         await session.refresh(start_event)
 
+    active_shift_cache.stage(session, ActiveShiftSnapshot.from_shift(new_shift, [start_event], active_shift_cache.max_events))
     return new_shift, text_manager.get("shift.new_started")
 
 @router.callback_query(F.data == "shift:start_now", ShiftStates.waiting_for_start_time)
@@ -285,15 +305,11 @@ async def process_manual_start_time(message: Message, state: FSMContext, session
             if parsed_time > now_moscow:
                 error_msg = await message.reply(text_manager.get("shift.start_time_in_future"))
                 error_occurred = True
-                await asyncio.sleep(3)
-                await error_msg.delete()
-                await message.delete()
+                ephemeral_messages.delete_later(error_msg, message)
     except ValueError:
         error_msg = await message.reply(text_manager.get("shift.start_time_invalid_format"))
         error_occurred = True
-        await asyncio.sleep(3)
-        await error_msg.delete()
-        await message.delete()
+        ephemeral_messages.delete_later(error_msg, message)
 
     if error_occurred or not parsed_time:
         return
@@ -309,9 +325,7 @@ async def process_manual_start_time(message: Message, state: FSMContext, session
 
     if not shift_to_display:
         error_msg = await message.reply(transition_message)
-        await asyncio.sleep(3)
-        await error_msg.delete()
-        await message.delete()
+        ephemeral_messages.delete_later(error_msg, message)
         return
 
     data = await state.get_data()
@@ -424,13 +438,12 @@ async def _finalize_shift_completion(
             await state.set_state(ShiftStates.waiting_for_end_time)
         else:
             error_msg = await call_or_message.reply(error_text)
-            await asyncio.sleep(3)
-            await error_msg.delete()
-            await call_or_message.delete()
+            ephemeral_messages.delete_later(error_msg, call_or_message)
         return
 
     shift.status = ShiftStatus.COMPLETED
     shift.end_time = end_time_dt
+    shift.net_profit = PeriodTotals.from_shift(shift).net_profit
     end_event = ShiftEvent(
         event_type=ShiftEventType.COMPLETE_SHIFT,
         details={"message": "Смена завершена"},
@@ -440,6 +453,10 @@ async def _finalize_shift_completion(
     session.add(shift)
     session.add(end_event)
 
+    await apply_completed_shift(session, shift)
+    active_shift_cache.invalidate(user_telegram_id)
+    replica_router.mark_primary_write(user_telegram_id)
+
     if user_db:
         user_db.default_rate = shift.rate
         user_db.default_order_rate = shift.order_rate
@@ -544,15 +561,11 @@ async def process_manual_end_time(message: Message, state: FSMContext, session:
             if parsed_time > now_moscow:
                 error_msg = await message.reply(text_manager.get("shift.end_time_in_future"))
                 error_occurred = True
-                await asyncio.sleep(3)
-                await error_msg.delete()
-                await message.delete()
+                ephemeral_messages.delete_later(error_msg, message)
     except ValueError:
         error_msg = await message.reply(text_manager.get("shift.end_time_invalid_format"))
         error_occurred = True
-        await asyncio.sleep(3)
-        await error_msg.delete()
-        await message.delete()
+        ephemeral_messages.delete_later(error_msg, message)
 
     if error_occurred or not parsed_time:
         return
@@ -576,11 +589,7 @@ async def cancel_manual_end_time_input(call: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data == "shift:show_active")
 async def show_active_shift_menu_callback(call: CallbackQuery, state: FSMContext, session: AsyncSession):
     user_id = call.from_user.id
-    stmt = select(Shift).where(
-        Shift.user_id == user_id,
-        Shift.status == ShiftStatus.ACTIVE
-    ).options(selectinload(Shift.events), selectinload(Shift.user))
-    shift = await session.scalar(stmt)
+    shift = await load_active_shift_snapshot(session, user_id)
 
     if not shift:
         await call.answer(text_manager.get("shift.no_active_shift"), show_alert=True)
@@ -628,21 +637,7 @@ async def handle_add_mileage_selected(call: CallbackQuery, state: FSMContext, se
         await call.answer(text_manager.get("shift.value_error_generic"), show_alert=True)
         return
 
-    stmt = select(Shift).where(
-        Shift.user_id == call.from_user.id,
-        Shift.status == ShiftStatus.ACTIVE
-    ).options(selectinload(Shift.events))
-    shift = await session.scalar(stmt)
-
-    shift.total_mileage = mileage_value
-    new_event = ShiftEvent(
-        event_type=ShiftEventType.ADD_MILEAGE,
-        details={"distance_km": mileage_value, "description": f"+{mileage_value} км"},
-        timestamp=datetime.now(ZoneInfo('Europe/Moscow'))
-    )
-    new_event.shift = shift
-    session.add_all([shift, new_event])
-    await session.flush()
+    shift = await _set_shift_mileage(session, call.from_user.id, mileage_value, f"+{mileage_value} км")
 
     if shift:
         await _return_to_active_shift_view(call, state, shift,
@@ -661,31 +656,15 @@ async def handle_add_mileage_input(message: Message, state: FSMContext, session:
         if mileage_value < 0:
             error_msg = await message.answer(text_manager.get("shift.value_error_negative"))
             await message.delete()
-            await asyncio.sleep(3)
-            await error_msg.delete()
+            ephemeral_messages.delete_later(error_msg)
             return
     except ValueError:
         error_msg = await message.answer(text_manager.get("shift.value_error_generic"))
         await message.delete()
-        await asyncio.sleep(3)
-        await error_msg.delete()
+        ephemeral_messages.delete_later(error_msg)
         return
 
-    stmt = select(Shift).where(
-        Shift.user_id == message.from_user.id,
-        Shift.status == ShiftStatus.ACTIVE
-    ).options(selectinload(Shift.events))
-    shift = await session.scalar(stmt)
-
-    shift.total_mileage = mileage_value
-    new_event = ShiftEvent(
-        event_type=ShiftEventType.ADD_MILEAGE,
-        details={"distance_km": mileage_value, "description": f"Пробег обновлен до {mileage_value} км"},
-        timestamp=datetime.now(ZoneInfo('Europe/Moscow'))
-    )
-    new_event.shift = shift
-    session.add_all([shift, new_event])
-    await session.flush()
+    shift = await _set_shift_mileage(session, message.from_user.id, mileage_value, f"Пробег обновлен до {mileage_value} км")
 
     if shift:
         await _return_to_active_shift_view(message, state, shift,
@@ -739,14 +718,12 @@ async def handle_add_tips_input(message: Message, state: FSMContext, session: As
         if tips_value < 0:
             error_msg = await message.answer(text_manager.get("shift.value_error_negative"))
             await message.delete()
-            await asyncio.sleep(3)
-            await error_msg.delete()
+            ephemeral_messages.delete_later(error_msg)
             return
     except ValueError:
         error_msg = await message.answer(text_manager.get("shift.value_error_generic"))
         await message.delete()
-        await asyncio.sleep(3)
-        await error_msg.delete()
+        ephemeral_messages.delete_later(error_msg)
         return
 
     shift = await _update_shift_value_and_event(
@@ -801,14 +778,12 @@ async def handle_add_expenses_amount_input(message: Message, state: FSMContext,
                 if expenses_value < 0 else "Сумма расхода должна быть больше нуля."
             error_msg = await message.answer(error_msg_text)
             await message.delete()
-            await asyncio.sleep(3)
-            await error_msg.delete()
+            ephemeral_messages.delete_later(error_msg)
             return
     except ValueError:
         error_msg = await message.answer(text_manager.get("shift.value_error_generic"))
         await message.delete()
-        await asyncio.sleep(3)
-        await error_msg.delete()
+        ephemeral_messages.delete_later(error_msg)
         return
 
     data = await state.get_data()
@@ -8,32 +8,24 @@ from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message, BufferedInputFile
 from dateutil.relativedelta import relativedelta
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
-from src.db.models import Shift, ShiftStatus
+from src.db.replica import replica_router
+from src.db.statistics import get_period_totals
 from src.keyboards.statistics_keyboards import get_period_selection_keyboard, back_to_period_selection_keyboard
 from src.states import MenuStates
-from src.utils.statistics_generator import generate_statistics_image
+from src.utils.image_cache import statistics_image_cache
+from src.utils.statistics_aggregate import StatisticsAggregate
+from src.utils.statistics_generator import (
+    build_statistics_template_data, format_statistics_text_report, render_statistics_data, statistics_image_cache_key,
+    statistics_renderer
+)
 from src.utils.text_manager import text_manager as tm
 
 logger = logging.getLogger(__name__)
 router = Router()
 MOSCOW_TZ = ZoneInfo("Europe/Moscow")
 
-async def get_shifts_for_period(session: AsyncSession, user_id: int, start_date: datetime, end_date: datetime) -> list[Shift]:
-    stmt = select(Shift).where(
-        Shift.user_id == user_id,
-        Shift.status == ShiftStatus.COMPLETED,
-        Shift.end_time >= start_date,
-        Shift.end_time <= end_date
-    ).options(
-        selectinload(Shift.events)
-    ).order_by(Shift.end_time.desc())
-    result = await session.execute(stmt)
-    return result.scalars().all()
-
 @router.callback_query(F.data == "statistics:select_period")
 async def cmd_select_statistics_period(call: CallbackQuery, state: FSMContext):
     await state.set_state(MenuStates.in_statistics)
@@ -99,7 +91,9 @@ async def process_period_selection(call_or_msg: CallbackQuery | Message, session
     except Exception as e_gen_msg:
         logger.error(f"General error sending 'generating stats' message: {e_gen_msg}")
 
-    shifts = await get_shifts_for_period(session, user_id, start_date, end_date)
+    totals = await replica_router.run_read_only(
+        session, user_id, lambda read_session: get_period_totals(read_session, user_id, start_date, end_date)
+    )
 
     if generating_msg:
         try:
@@ -107,7 +101,7 @@ async def process_period_selection(call_or_msg: CallbackQuery | Message, session
         except TelegramBadRequest as e:
             logger.warning(f"Could not delete 'generating stats' message: {e}")
 
-    if not shifts:
+    if totals.shifts_count == 0:
         await bot_instance.send_message(
             chat_id=chat_id,
             text=tm.get("statistics.no_data"),
@@ -117,20 +111,47 @@ async def process_period_selection(call_or_msg: CallbackQuery | Message, session
             await call_or_msg.answer()
             return
 
-    generated_image_data: BytesIO | None = await generate_statistics_image(shifts, period_name_for_img, start_date, end_date)
+    # Render processes reload texts.yaml only for their base layer; the units, period names and cache key built
+    # here come from this process, so it has to pick up edits too.
+    tm.reload_if_changed()
+    data_for_template = build_statistics_template_data(
+        StatisticsAggregate.from_totals(totals), period_name_for_img, start_date, end_date
+    )
+    cache_key = statistics_image_cache_key(data_for_template, period_name_for_img)
+    cached_file_id = await statistics_image_cache.get(session, cache_key)
+
+    if cached_file_id:
+        try:
+            await bot_instance.send_photo(
+                chat_id=chat_id,
+                photo=cached_file_id,
+                caption=tm.get("statistics.title"),
+                reply_markup=back_to_period_selection_keyboard()
+            )
+            if isinstance(call_or_msg, CallbackQuery): await call_or_msg.answer()
+            return
+        except TelegramBadRequest as e:
+            logger.warning(f"Cached statistics image {cached_file_id} was rejected, rendering it again: {e}")
+            await statistics_image_cache.invalidate(session, cache_key)
+
+    generated_image_data: BytesIO | None = await render_statistics_data(data_for_template, period_name_for_img)
 
     if generated_image_data:
-        await bot_instance.send_photo(
+        sent_message = await bot_instance.send_photo(
             chat_id=chat_id,
-            photo=BufferedInputFile(generated_image_data.getvalue(), filename="statistics.png"),
+            photo=BufferedInputFile(generated_image_data.getvalue(), filename=f"statistics.{statistics_renderer.file_extension}"),
             caption=tm.get("statistics.title"),
             reply_markup=back_to_period_selection_keyboard()
         )
+        if sent_message.photo:
+            await statistics_image_cache.put(session, cache_key, sent_message.photo[-1].file_id)
     else:
+        # The numbers don't depend on Pillow, so a failed render still answers with them as text.
         await bot_instance.send_message(
             chat_id=chat_id,
-            text=tm.get("statistics.error_generating"),
-            reply_markup=back_to_period_selection_keyboard()
+            text=format_statistics_text_report(data_for_template, period_name_for_img),
+            reply_markup=back_to_period_selection_keyboard(),
+            parse_mode="HTML"
         )
 
     if isinstance(call_or_msg, CallbackQuery): await call_or_msg.answer()
@@ -1,57 +1,46 @@
 import logging
-from typing import List
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional, Tuple
 from zoneinfo import ZoneInfo
 
-from aiogram.types import InlineKeyboardMarkup
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from src.db.models import Shift, ShiftStatus, ShiftEventType
+from src.db.models import Shift, ShiftStatus
+from src.db.statistics import PeriodTotals
 from src.utils.text_manager import text_manager as tm
 
 logger = logging.getLogger(__name__)
 MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
+# Keyset cursor directions: "a" - shifts after the key (older), "b" - before it (newer), "c" - starting at the key.
+HistoryCursor = Tuple[str, datetime, int]
 
-def _calculate_shift_profit_for_button(shift: Shift) -> float:
-    if not shift.start_time or not shift.end_time:
-        return 0.0
-
-    duration_seconds = (shift.end_time - shift.start_time).total_seconds()
-    if duration_seconds <= 0:
-        return 0.0
 
-    duration_hours = duration_seconds / 3600.0
+def encode_history_cursor(direction: str, shift: Shift) -> str:
+    end_time = shift.end_time if shift.end_time.tzinfo else shift.end_time.replace(tzinfo=MOSCOW_TZ)
+    return f"{direction}:{(end_time - EPOCH) // timedelta(microseconds=1)}:{shift.id}"
 
-    revenue_from_time = duration_hours * (shift.rate or 0.0)
-    revenue_from_orders = (shift.orders_count or 0) * (shift.order_rate or 0.0)
-    total_tips = shift.total_tips or 0.0
-    gross_income = revenue_from_time + revenue_from_orders + total_tips
 
-    mileage_cost = (shift.total_mileage or 0.0) * (shift.mileage_rate or 0.0)
+def decode_history_cursor(parts: List[str]) -> Optional[HistoryCursor]:
+    if len(parts) != 3 or parts[0] not in ("a", "b", "c"):
+        return None
+    direction, end_time_us, shift_id = parts
+    return direction, EPOCH + timedelta(microseconds=int(end_time_us)), int(shift_id)
 
-    manual_food_expenses = 0.0
-    manual_other_expenses = 0.0
-    if hasattr(shift, 'events') and shift.events:
-        for event in shift.events:
-            if event.event_type == ShiftEventType.ADD_EXPENSE and isinstance(event.details, dict):
-                amount = event.details.get("amount", 0.0)
-                category_code = event.details.get("category_code", "other")
-                if category_code == "food":
-                    manual_food_expenses += amount
-                elif category_code == "other":
-                    manual_other_expenses += amount
 
-    total_manual_expenses = manual_food_expenses + manual_other_expenses
-    total_operational_expenses = total_manual_expenses + mileage_cost
+def _calculate_shift_profit_for_button(shift: Shift) -> float:
+    if not shift.start_time or not shift.end_time:
+        return 0.0
 
-    tax_rate_decimal = 0.05
-    tax_amount = gross_income * tax_rate_decimal
+    if shift.net_profit is not None:
+        return shift.net_profit
 
-    net_profit = gross_income - total_operational_expenses - tax_amount
-    return net_profit
+    return PeriodTotals.from_shift(shift).net_profit
 
 
-def history_selection_keyboard(shifts: List[Shift],current_page: int,total_pages: int) -> InlineKeyboardMarkup:
+def history_selection_keyboard(shifts: List[Shift],current_page: int,total_pages: int, has_next_page: Optional[bool] = None) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
     if shifts:
@@ -109,12 +98,17 @@ def history_selection_keyboard(shifts: List[Shift],current_page: int,total_pages
         builder.adjust(1)
 
     pagination_buttons = []
-    has_prev_page = current_page > 1
-    has_next_page = current_page < total_pages
+    has_prev_page = current_page > 1 and bool(shifts)
+    if has_next_page is None:
+        has_next_page = current_page < total_pages
+    has_next_page = has_next_page and bool(shifts)
 
     if has_prev_page:
+        prev_callback_data = f"history:page:{current_page - 1}"
+        if current_page > 2:
+            prev_callback_data += f":{encode_history_cursor('b', shifts[0])}"
         pagination_buttons.append(
-            InlineKeyboardBuilder().button(text="⬅️ Пред.", callback_data=f"history:page:{current_page - 1}").as_markup().inline_keyboard[0][0]
+            InlineKeyboardBuilder().button(text="⬅️ Пред.", callback_data=prev_callback_data).as_markup().inline_keyboard[0][0]
         )
 
     if total_pages > 1:
@@ -124,13 +118,20 @@ def history_selection_keyboard(shifts: List[Shift],current_page: int,total_pages
 
     if has_next_page:
         pagination_buttons.append(
-            InlineKeyboardBuilder().button(text="След. ➡️", callback_data=f"history:page:{current_page + 1}").as_markup().inline_keyboard[0][0]
+            InlineKeyboardBuilder().button(text="След. ➡️", callback_data=f"history:page:{current_page + 1}:{encode_history_cursor('a', shifts[-1])}").as_markup().inline_keyboard[0][0]
         )
 
     if pagination_buttons:
         builder.row(*pagination_buttons)
 
-    builder.button(text=tm.get("common.buttons.back_to_main_menu", "Главное меню"), callback_data="main_menu")
+    if shifts:
+        builder.row(
+            InlineKeyboardButton(text=tm.get("history.buttons.export_csv", "📤 CSV"), callback_data="history:export:csv"),
+            InlineKeyboardButton(text=tm.get("history.buttons.export_jsonl", "📤 JSON"), callback_data="history:export:jsonl")
+        )
+    builder.row(InlineKeyboardButton(text=tm.get("history.buttons.import_csv", "📥 Импорт CSV"), callback_data="history:import"))
+
+    builder.row(InlineKeyboardButton(text=tm.get("common.buttons.back_to_main_menu", "Главное меню"), callback_data="main_menu"))
     return builder.as_markup()
 
 def shift_details_keyboard(shift_id: int) -> InlineKeyboardMarkup:
@@ -152,4 +153,9 @@ def confirm_delete_shift_keyboard(shift_id: int) -> InlineKeyboardMarkup:
         callback_data=f"history:delete_shift_cancel:{shift_id}"
     )
     builder.adjust(2)
-    return builder.as_markup()
\ No newline at end of file
+    return builder.as_markup()
+
+def import_prompt_keyboard() -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    builder.button(text=tm.get("history.buttons.back_to_list", "К списку смен"), callback_data="history:import_cancel")
+    return builder.as_markup()
@@ -0,0 +1,4 @@
+from src.middlewares.ordering import UserOrderingMiddleware
+from src.middlewares.rendering import RenderResetMiddleware
+
+__all__ = ["RenderResetMiddleware", "UserOrderingMiddleware"]
\ No newline at end of file
@@ -0,0 +1,52 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _UserQueue:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    pending: int = 0
+
+
+class UserOrderingMiddleware(BaseMiddleware):
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._queues: Dict[int, _UserQueue] = {}
+        self.in_flight = 0
+
+    @property
+    def queued_users(self) -> int:
+        return len(self._queues)
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]], event: TelegramObject, data: Dict[str, Any]) -> Any:
+        user: User = data.get("event_from_user")
+        if user is None:
+            return await self._run(handler, event, data)
+
+        queue = self._queues.get(user.id)
+        if queue is None:
+            queue = self._queues[user.id] = _UserQueue()
+        queue.pending += 1
+        try:
+            # asyncio.Lock wakes waiters in FIFO order, so a user's updates run one at a time in arrival order.
+            async with queue.lock:
+                return await self._run(handler, event, data)
+        finally:
+            queue.pending -= 1
+            if queue.pending == 0:
+                del self._queues[user.id]
+
+    async def _run(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]], event: TelegramObject, data: Dict[str, Any]) -> Any:
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await handler(event, data)
+            finally:
+                self.in_flight -= 1
@@ -0,0 +1,17 @@
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject
+import logging
+
+from src.utils.message_renderer import message_renderer
+
+logger = logging.getLogger(__name__)
+
+class RenderResetMiddleware(BaseMiddleware):
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]], event: TelegramObject, data: Dict[str, Any]) -> Any:
+        # Handlers that draw a different screen must not be overwritten by a delayed active-shift edit.
+        chat = data.get("event_chat")
+        if chat is not None and not get_flag(data, "coalesced_render"):
+            message_renderer.reset(chat.id)
+        return await handler(event, data)
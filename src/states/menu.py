@@ -5,4 +5,5 @@ class MenuStates(StatesGroup):
     in_statistics = State()
     in_history = State()
     in_profile = State()
-    confirming_shift_deletion = State()
\ No newline at end of file
+    confirming_shift_deletion = State()
+    waiting_for_import_file = State()
\ No newline at end of file
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from multiprocessing.sharedctypes import SynchronizedArray
+from typing import Any, Dict, List, Optional, Set
+
+from aiogram import Bot
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+UPDATE_USER_FIELDS = (
+    "message", "edited_message", "callback_query", "inline_query", "chosen_inline_result",
+    "shipping_query", "pre_checkout_query", "poll_answer", "my_chat_member", "chat_member", "chat_join_request",
+)
+
+
+def update_user_id(update: Dict[str, Any]) -> Optional[int]:
+    for field in UPDATE_USER_FIELDS:
+        payload = update.get(field)
+        if not payload:
+            continue
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+        chat = payload.get("chat")
+        if chat:
+            return chat["id"]
+    return None
+
+
+def worker_index(update: Dict[str, Any], workers: int) -> int:
+    # Sticky routing: every update of a user lands on the same worker, which keeps per-user order and local caches valid.
+    user_id = update_user_id(update)
+    return (user_id if user_id is not None else update["update_id"]) % workers
+
+
+def _run_worker(index: int, queue: Queue, queued: SynchronizedArray, processed: SynchronizedArray):
+    logging.basicConfig(level=logging.INFO, format=f'%(asctime)s - worker-{index} - %(name)s - %(levelname)s - %(message)s')
+    # Ctrl-C reaches the whole process group; workers wait for the supervisor's sentinel so they can drain their queue.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        asyncio.run(_worker_loop(index, queue, queued, processed))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _process_update(index: int, dp, bot: Bot, update: Dict[str, Any], queued: SynchronizedArray, processed: SynchronizedArray):
+    try:
+        await dp.feed_raw_update(bot, update)
+    except Exception as e:
+        logger.error(f"Worker {index} failed to process update {update.get('update_id')}: {e}", exc_info=True)
+    finally:
+        with queued.get_lock():
+            queued[index] -= 1
+        with processed.get_lock():
+            processed[index] += 1
+
+
+async def _worker_loop(index: int, queue: Queue, queued: SynchronizedArray, processed: SynchronizedArray):
+    from src.bot import create_dispatcher, shutdown
+
+    bot = Bot(token=settings.telegram_bot_token)
+    dp = create_dispatcher()
+    loop = asyncio.get_running_loop()
+    await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp, **dp.workflow_data)
+    logger.info(f"Worker {index} started.")
+    in_flight: Set[asyncio.Task] = set()
+    try:
+        while True:
+            update = await loop.run_in_executor(None, queue.get)
+            if update is None:
+                break
+            # Updates run concurrently; UserOrderingMiddleware keeps each user's order and caps how many are in flight.
+            task = asyncio.create_task(_process_update(index, dp, bot, update, queued, processed))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+    finally:
+        if in_flight:
+            logger.info(f"Worker {index} waiting for {len(in_flight)} updates in flight.")
+            await asyncio.gather(*in_flight, return_exceptions=True)
+        await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp, **dp.workflow_data)
+        await shutdown(dp, bot)
+        logger.info(f"Worker {index} stopped.")
+
+
+class WorkerSupervisor:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._ctx = multiprocessing.get_context("spawn")
+        self._queues: List[Queue] = [self._ctx.Queue() for _ in range(workers)]
+        self.queued = self._ctx.Array("l", workers)
+        self.processed = self._ctx.Array("l", workers)
+        self._processes: List[Optional[BaseProcess]] = [None] * workers
+        self.next_offset: Optional[int] = None
+
+    def start(self):
+        for index in range(self.workers):
+            self._start_worker(index)
+
+    def _start_worker(self, index: int):
+        process = self._ctx.Process(
+            target=_run_worker,
+            args=(index, self._queues[index], self.queued, self.processed),
+            name=f"shift-bot-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    def dispatch(self, update: Dict[str, Any]):
+        index = worker_index(update, self.workers)
+        with self.queued.get_lock():
+            self.queued[index] += 1
+        self._queues[index].put(update)
+        self.next_offset = update["update_id"] + 1
+
+    def check_workers(self):
+        for index, process in enumerate(self._processes):
+            if process is not None and not process.is_alive():
+                logger.error(f"Worker {index} exited with code {process.exitcode}, restarting it.")
+                self._start_worker(index)
+
+    def load(self) -> List[Dict[str, int]]:
+        return [
+            {"worker": index, "queued": self.queued[index], "processed": self.processed[index]}
+            for index in range(self.workers)
+        ]
+
+    def stop(self, timeout: float):
+        for queue in self._queues:
+            queue.put(None)
+        for index, process in enumerate(self._processes):
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                logger.warning(f"Worker {index} did not stop within {timeout}s, terminating it.")
+                process.terminate()
+
+
+async def _report_load(supervisor: WorkerSupervisor, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        supervisor.check_workers()
+        load = ", ".join(f"#{w['worker']}: queued={w['queued']} processed={w['processed']}" for w in supervisor.load())
+        logger.info(f"Worker load: {load}")
+
+
+async def _poll_updates(bot: Bot, supervisor: WorkerSupervisor, allowed_updates: List[str]):
+    await bot.delete_webhook()
+    while True:
+        try:
+            updates = await bot.get_updates(offset=supervisor.next_offset, timeout=30, allowed_updates=allowed_updates)
+        except Exception as e:
+            logger.error(f"Failed to fetch updates: {e}")
+            await asyncio.sleep(1)
+            continue
+        # No await inside the batch, so a stop signal never leaves it half dispatched.
+        for update in updates:
+            supervisor.dispatch(update.model_dump(mode="json", exclude_unset=True, by_alias=True))
+
+
+async def _confirm_offset(bot: Bot, offset: Optional[int]):
+    # Telegram only forgets a batch once a later getUpdates passes its offset. Without this the next process would
+    # receive the last dispatched batch again and repeat orders, expenses or shift completions.
+    if offset is None:
+        return
+    try:
+        await bot.get_updates(offset=offset, limit=1, timeout=0)
+        logger.info(f"Confirmed updates up to offset {offset}.")
+    except Exception as e:
+        logger.error(f"Failed to confirm update offset {offset}; the last batch may be delivered again: {e}")
+
+
+async def run_supervisor(bot: Bot, allowed_updates: List[str]):
+    supervisor = WorkerSupervisor(settings.workers)
+    supervisor.start()
+    logger.info(f"Started {settings.workers} worker processes.")
+
+    loop = asyncio.get_running_loop()
+    stop_requested = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop_requested.set)
+
+    report_task = asyncio.create_task(_report_load(supervisor, settings.worker_load_report_interval))
+    poll_task = asyncio.create_task(_poll_updates(bot, supervisor, allowed_updates))
+    stop_task = asyncio.create_task(stop_requested.wait())
+    try:
+        await asyncio.wait({poll_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+        if poll_task.done():
+            poll_task.result()
+        logger.info("Stop signal received, no longer polling for updates.")
+    finally:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(sig)
+        for task in (report_task, poll_task, stop_task):
+            task.cancel()
+        await asyncio.gather(report_task, poll_task, stop_task, return_exceptions=True)
+        await loop.run_in_executor(None, supervisor.stop, settings.worker_stop_timeout)
+        logger.info(f"Workers stopped: {supervisor.load()}")
+        await _confirm_offset(bot, supervisor.next_offset)
@@ -0,0 +1,181 @@
+import logging
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, Optional, Union
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Row, event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.config import settings
+from src.db.models import Shift, ShiftEvent, ShiftEventType, ShiftStatus
+from src.db.shift_mutations import mutate_active_shift
+
+logger = logging.getLogger(__name__)
+MOSCOW_TZ = ZoneInfo('Europe/Moscow')
+PENDING_SNAPSHOTS_KEY = "active_shift_cache_pending"
+
+
+@dataclass
+class CachedShiftEvent:
+    event_type: ShiftEventType
+    timestamp: datetime
+    details: Optional[Dict[str, Any]]
+
+
+@dataclass
+class ActiveShiftSnapshot:
+    id: int
+    user_id: int
+    status: ShiftStatus
+    start_time: datetime
+    orders_count: int = 0
+    total_mileage: float = 0.0
+    total_tips: float = 0.0
+    total_expenses: float = 0.0
+    food_expenses: float = 0.0
+    other_expenses: float = 0.0
+    rate: float = 0.0
+    order_rate: float = 0.0
+    mileage_rate: float = 0.0
+    events: Deque[CachedShiftEvent] = field(default_factory=deque)
+
+    @classmethod
+    def from_shift(cls, shift: Union[Shift, Row], events: Iterable[ShiftEvent], max_events: int) -> "ActiveShiftSnapshot":
+        recent_events = sorted((e for e in events if e.timestamp is not None), key=lambda e: e.timestamp)[-max_events:]
+        return cls(
+            id=shift.id,
+            user_id=shift.user_id,
+            status=shift.status,
+            start_time=shift.start_time,
+            orders_count=shift.orders_count or 0,
+            total_mileage=shift.total_mileage or 0.0,
+            total_tips=shift.total_tips or 0.0,
+            total_expenses=shift.total_expenses or 0.0,
+            food_expenses=shift.food_expenses or 0.0,
+            other_expenses=shift.other_expenses or 0.0,
+            rate=shift.rate or 0.0,
+            order_rate=shift.order_rate or 0.0,
+            mileage_rate=shift.mileage_rate or 0.0,
+            events=deque(
+                (CachedShiftEvent(e.event_type, e.timestamp, e.details) for e in recent_events),
+                maxlen=max_events
+            ),
+        )
+
+    def copy(self) -> "ActiveShiftSnapshot":
+        return replace(self, events=deque(self.events, maxlen=self.events.maxlen))
+
+    def add_event(self, event_type: ShiftEventType, details: Optional[Dict[str, Any]], timestamp: datetime):
+        self.events.append(CachedShiftEvent(event_type, timestamp, details))
+
+
+class ActiveShiftCache:
+    def __init__(self, max_size: int, max_events: int):
+        self.max_size = max_size
+        self.max_events = max_events
+        self._entries: "OrderedDict[int, ActiveShiftSnapshot]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_id: int) -> Optional[ActiveShiftSnapshot]:
+        snapshot = self._entries.get(user_id)
+        if snapshot is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return snapshot
+
+    def put(self, snapshot: ActiveShiftSnapshot):
+        self._entries[snapshot.user_id] = snapshot
+        self._entries.move_to_end(snapshot.user_id)
+        while len(self._entries) > self.max_size:
+            evicted_user_id, _ = self._entries.popitem(last=False)
+            logger.debug(f"Evicted active shift of user {evicted_user_id} from cache.")
+
+    def invalidate(self, user_id: int):
+        if self._entries.pop(user_id, None) is not None:
+            logger.debug(f"Invalidated cached active shift of user {user_id}.")
+
+    def stage(self, session: AsyncSession, snapshot: ActiveShiftSnapshot):
+        # Written snapshots only reach the cache once the session commits, see _apply_staged_snapshots.
+        session.sync_session.info.setdefault(PENDING_SNAPSHOTS_KEY, {})[snapshot.user_id] = snapshot
+
+    def staged(self, session: AsyncSession, user_id: int) -> Optional[ActiveShiftSnapshot]:
+        return session.sync_session.info.get(PENDING_SNAPSHOTS_KEY, {}).get(user_id)
+
+
+active_shift_cache = ActiveShiftCache(
+    max_size=settings.active_shift_cache_size,
+    max_events=settings.active_shift_cache_events
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged_snapshots(session: Session):
+    if session.in_nested_transaction():
+        return
+    for snapshot in session.info.pop(PENDING_SNAPSHOTS_KEY, {}).values():
+        active_shift_cache.put(snapshot)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_staged_snapshots(session: Session, previous_transaction):
+    for user_id in session.info.pop(PENDING_SNAPSHOTS_KEY, {}):
+        active_shift_cache.invalidate(user_id)
+
+
+async def _load_recent_events(session: AsyncSession, shift_id: int) -> Iterable[ShiftEvent]:
+    return (await session.scalars(
+        select(ShiftEvent).where(ShiftEvent.shift_id == shift_id).order_by(ShiftEvent.timestamp.desc()).limit(active_shift_cache.max_events)
+    )).all()
+
+
+async def load_active_shift_snapshot(session: AsyncSession, user_id: int) -> Optional[ActiveShiftSnapshot]:
+    snapshot = active_shift_cache.staged(session, user_id) or active_shift_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
+
+    shift = await session.scalar(select(Shift).where(
+        Shift.user_id == user_id,
+        Shift.status == ShiftStatus.ACTIVE
+    ))
+    if not shift:
+        return None
+
+    snapshot = ActiveShiftSnapshot.from_shift(shift, await _load_recent_events(session, shift.id), active_shift_cache.max_events)
+    active_shift_cache.put(snapshot)
+    return snapshot
+
+
+async def write_active_shift(
+        session: AsyncSession,
+        user_id: int,
+        increments: Optional[Dict[str, float]] = None,
+        assignments: Optional[Dict[str, Any]] = None,
+        event_type: Optional[ShiftEventType] = None,
+        event_details: Optional[Dict[str, Any]] = None
+) -> Optional[ActiveShiftSnapshot]:
+    timestamp = datetime.now(MOSCOW_TZ)
+    row = await mutate_active_shift(session, user_id, increments, assignments, event_type, event_details, timestamp)
+    if row is None:
+        active_shift_cache.invalidate(user_id)
+        return None
+
+    cached = active_shift_cache.staged(session, user_id) or active_shift_cache.get(user_id)
+    if cached is not None and cached.id == row.id:
+        snapshot = ActiveShiftSnapshot.from_shift(row, (), active_shift_cache.max_events)
+        snapshot.events.extend(cached.events)
+        if event_type is not None:
+            snapshot.add_event(event_type, event_details, timestamp)
+    else:
+        snapshot = ActiveShiftSnapshot.from_shift(row, await _load_recent_events(session, row.id), active_shift_cache.max_events)
+
+    active_shift_cache.stage(session, snapshot)
+    return snapshot
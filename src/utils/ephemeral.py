@@ -0,0 +1,93 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.types import Message
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+DELETE_MESSAGES_BATCH_SIZE = 100
+
+
+class EphemeralMessageService:
+    def __init__(self, default_delay: float, batch_window: float):
+        self.default_delay = default_delay
+        self.batch_window = batch_window
+        self._queue: List[Tuple[float, int, Bot, int, int]] = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def schedule(self, bot: Bot, chat_id: int, message_id: int, delay: Optional[float] = None):
+        due = time.monotonic() + (self.default_delay if delay is None else delay)
+        heapq.heappush(self._queue, (due, next(self._counter), bot, chat_id, message_id))
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def delete_later(self, *messages: Message, delay: Optional[float] = None):
+        for message in messages:
+            self.schedule(message.bot, message.chat.id, message.message_id, delay)
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._queue:
+            logger.info(f"Deleting {len(self._queue)} scheduled messages on shutdown.")
+            await self._delete(self._pop_due(float("inf")))
+
+    async def _run(self):
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Deletions due within the batch window are sent together in one delete_messages call per chat.
+            timeout = self._queue[0][0] - time.monotonic()
+            if timeout > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._delete(self._pop_due(time.monotonic() + self.batch_window))
+
+    def _pop_due(self, deadline: float) -> Dict[Tuple[Bot, int], List[int]]:
+        batches: Dict[Tuple[Bot, int], List[int]] = defaultdict(list)
+        while self._queue and self._queue[0][0] <= deadline:
+            _, _, bot, chat_id, message_id = heapq.heappop(self._queue)
+            batches[(bot, chat_id)].append(message_id)
+        return batches
+
+    async def _delete(self, batches: Dict[Tuple[Bot, int], List[int]]):
+        for (bot, chat_id), message_ids in batches.items():
+            for i in range(0, len(message_ids), DELETE_MESSAGES_BATCH_SIZE):
+                chunk = message_ids[i:i + DELETE_MESSAGES_BATCH_SIZE]
+                try:
+                    await bot.delete_messages(chat_id=chat_id, message_ids=chunk)
+                except Exception as e:
+                    logger.warning(f"Failed to delete messages {chunk} in chat {chat_id}: {e}")
+
+
+ephemeral_messages = EphemeralMessageService(
+    default_delay=settings.ephemeral_message_delay,
+    batch_window=settings.ephemeral_batch_window
+)
@@ -63,14 +63,14 @@ async def get_active_shift_message_text(shift: Shift) -> str:
         start_local = shift.start_time.astimezone(MOSCOW_TZ)
 
     history_lines: List[str] = []
-    food_expenses_raw = 0.0
-    other_expenses_raw = 0.0
+    food_expenses_raw = shift.food_expenses or 0.0
+    other_expenses_raw = shift.other_expenses or 0.0
 
     if hasattr(shift, 'events') and shift.events:
         valid_events = [e for e in shift.events if e.timestamp is not None]
         sorted_events: List[ShiftEvent] = sorted(valid_events, key=lambda e: e.timestamp, reverse=True)
 
-        for event in sorted_events: # Iterate through all events for history and expense calculation
+        for event in sorted_events:
             event_time_str = event.timestamp.astimezone(MOSCOW_TZ).strftime('%H:%M')
             details_data: Dict[str, Any] = event.details if isinstance(event.details, dict) else {}
 
@@ -92,12 +92,7 @@ async def get_active_shift_message_text(shift: Shift) -> str:
                 event_type_str = "💸 -Расход"
                 amount = details_data.get('amount', 0.0)
                 category = details_data.get('category', 'Прочее') # For display string
-                category_code = details_data.get('category_code', 'other') # For calculation
                 details_str = details_data.get("description", f"-{amount} руб. ({category})")
-                if category_code == "food":
-                    food_expenses_raw += float(amount)
-                elif category_code == "other":
-                    other_expenses_raw += float(amount)
             elif event.event_type == ShiftEventType.ADD_MILEAGE:
                 event_type_str = "🚗 Пробег"
                 distance = details_data.get('distance_km', '?')
@@ -181,14 +176,14 @@ async def format_completed_shift_details_message(shift: Shift) -> str:
 
 
     history_lines: List[str] = []
-    food_expenses_raw = 0.0
-    other_expenses_raw = 0.0
+    food_expenses_raw = shift.food_expenses or 0.0
+    other_expenses_raw = shift.other_expenses or 0.0
 
     if hasattr(shift, 'events') and shift.events:
         valid_events = [e for e in shift.events if e.timestamp is not None]
         sorted_events: List[ShiftEvent] = sorted(valid_events, key=lambda e: e.timestamp, reverse=True)
 
-        for event in sorted_events: # Iterate through all events for history and expense calculation
+        for event in sorted_events:
             event_time_str = event.timestamp.astimezone(MOSCOW_TZ).strftime('%H:%M')
             details_data: Dict[str, Any] = event.details if isinstance(event.details, dict) else {}
             if event.event_type == ShiftEventType.START_SHIFT:
@@ -209,12 +204,7 @@ async def format_completed_shift_details_message(shift: Shift) -> str:
                 event_type_str = "💸 -Расход"
                 amount = details_data.get('amount', 0.0)
                 category = details_data.get('category', 'Прочее') # For display string
-                category_code = details_data.get('category_code', 'other') # For calculation
                 details_str = details_data.get("description", f"-{amount} руб. ({category})")
-                if category_code == "food":
-                    food_expenses_raw += float(amount)
-                elif category_code == "other":
-                    other_expenses_raw += float(amount)
             elif event.event_type == ShiftEventType.ADD_MILEAGE:
                 event_type_str = "🚗 +Пробег"
                 distance = details_data.get('distance_km','?')
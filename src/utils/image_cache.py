@@ -0,0 +1,96 @@
+import logging
+from collections import OrderedDict
+from typing import Optional, Set
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.db.models import StatisticsImageCacheEntry
+
+logger = logging.getLogger(__name__)
+
+TRIM_EVERY_PUTS = 50
+TOUCH_BATCH_SIZE = 20
+
+
+class StatisticsImageCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._puts_since_trim = 0
+        self._touched: Set[str] = set()
+        self._hits_since_touch = 0
+
+    def _remember(self, key: str, file_id: str):
+        self._entries[key] = file_id
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, session: AsyncSession, key: str) -> Optional[str]:
+        file_id = self._entries.get(key)
+        if file_id is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Memory hits refresh last_used_at in batches, so trim() doesn't evict the hottest images from the table.
+            self._touched.add(key)
+            self._hits_since_touch += 1
+            if self._hits_since_touch >= TOUCH_BATCH_SIZE:
+                await self._flush_touched(session)
+            return file_id
+
+        # Entries survive restarts in the table; a hit there also refreshes its LRU position.
+        file_id = await session.scalar(
+            update(StatisticsImageCacheEntry).where(StatisticsImageCacheEntry.key == key)
+            .values(last_used_at=func.now()).returning(StatisticsImageCacheEntry.file_id)
+        )
+        if file_id is None:
+            self.misses += 1
+            return None
+        self._remember(key, file_id)
+        self.hits += 1
+        return file_id
+
+    async def put(self, session: AsyncSession, key: str, file_id: str):
+        self._remember(key, file_id)
+        stmt = pg_insert(StatisticsImageCacheEntry).values(key=key, file_id=file_id)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[StatisticsImageCacheEntry.key],
+            set_={"file_id": stmt.excluded.file_id, "last_used_at": func.now()}
+        ))
+        self._puts_since_trim += 1
+        if self._puts_since_trim >= TRIM_EVERY_PUTS:
+            self._puts_since_trim = 0
+            await self.trim(session)
+
+    async def invalidate(self, session: AsyncSession, key: str):
+        self._entries.pop(key, None)
+        self._touched.discard(key)
+        await session.execute(delete(StatisticsImageCacheEntry).where(StatisticsImageCacheEntry.key == key))
+
+    async def _flush_touched(self, session: AsyncSession):
+        if not self._touched:
+            return
+        keys, self._touched, self._hits_since_touch = list(self._touched), set(), 0
+        await session.execute(
+            update(StatisticsImageCacheEntry).where(StatisticsImageCacheEntry.key.in_(keys)).values(last_used_at=func.now())
+        )
+
+    async def trim(self, session: AsyncSession) -> int:
+        await self._flush_touched(session)
+        keep = select(StatisticsImageCacheEntry.key).order_by(
+            StatisticsImageCacheEntry.last_used_at.desc()
+        ).limit(self.max_entries)
+        result = await session.execute(
+            delete(StatisticsImageCacheEntry).where(StatisticsImageCacheEntry.key.not_in(keep))
+        )
+        if result.rowcount:
+            logger.info(f"Evicted {result.rowcount} statistics images from the cache (hits {self.hits}, misses {self.misses}).")
+        return result.rowcount
+
+
+statistics_image_cache = StatisticsImageCache(settings.statistics_image_cache_size)
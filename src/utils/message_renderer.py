@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InlineKeyboardMarkup
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingEdit:
+    bot: Bot
+    message_id: int
+    text: str
+    reply_markup: Optional[InlineKeyboardMarkup]
+    parse_mode: Optional[str]
+    digest: str
+    task: Optional[asyncio.Task] = None
+
+
+def render_digest(text: str, reply_markup: Optional[InlineKeyboardMarkup]) -> str:
+    markup_json = reply_markup.model_dump_json(exclude_none=True) if reply_markup else ""
+    return hashlib.sha1(f"{text}\x00{markup_json}".encode("utf-8")).hexdigest()
+
+
+class MessageRenderer:
+    def __init__(self, delay: float, max_tracked_chats: int = 4096, shutdown_retry_limit: float = 5.0):
+        self.delay = delay
+        self.max_tracked_chats = max_tracked_chats
+        self.shutdown_retry_limit = shutdown_retry_limit
+        self._pending: Dict[int, PendingEdit] = {}
+        self._last_sent: "OrderedDict[int, Tuple[int, str]]" = OrderedDict()
+        self.edits_sent = 0
+        self.edits_coalesced = 0
+        self.edits_skipped = 0
+
+    async def schedule_edit(
+            self,
+            bot: Bot,
+            chat_id: int,
+            message_id: int,
+            text: str,
+            reply_markup: Optional[InlineKeyboardMarkup] = None,
+            parse_mode: Optional[str] = "HTML"
+    ):
+        digest = render_digest(text, reply_markup)
+        pending = self._pending.get(chat_id)
+        if pending is not None and pending.message_id == message_id:
+            pending.text, pending.reply_markup, pending.parse_mode, pending.digest = text, reply_markup, parse_mode, digest
+            self.edits_coalesced += 1
+            return
+
+        if pending is not None:
+            self._cancel(chat_id)
+        if self._last_sent.get(chat_id) == (message_id, digest):
+            self.edits_skipped += 1
+            return
+
+        pending = PendingEdit(bot, message_id, text, reply_markup, parse_mode, digest)
+        pending.task = asyncio.create_task(self._flush_later(chat_id, pending))
+        self._pending[chat_id] = pending
+
+    def reset(self, chat_id: int):
+        self._cancel(chat_id)
+        self._last_sent.pop(chat_id, None)
+
+    async def flush_all(self):
+        chat_ids = list(self._pending)
+        if chat_ids:
+            logger.info(f"Flushing {len(chat_ids)} pending message edits.")
+        for chat_id in chat_ids:
+            pending = self._pending.get(chat_id)
+            if pending is None:
+                continue
+            if pending.task and pending.task is not asyncio.current_task():
+                pending.task.cancel()
+            # A retry task scheduled now would never run, so flood control is waited out here, within a limit.
+            retry_after = await self._flush(chat_id, pending, reschedule=False)
+            if retry_after is not None and retry_after <= self.shutdown_retry_limit:
+                await asyncio.sleep(retry_after)
+                if self._pending.setdefault(chat_id, pending) is pending:
+                    retry_after = await self._flush(chat_id, pending, reschedule=False)
+                else:
+                    retry_after = None
+            if retry_after is not None:
+                logger.warning(
+                    f"Dropping edit of message {pending.message_id} in chat {chat_id} on shutdown: "
+                    f"flood control asks to wait {retry_after}s."
+                )
+
+    def _cancel(self, chat_id: int):
+        pending = self._pending.pop(chat_id, None)
+        if pending and pending.task and pending.task is not asyncio.current_task():
+            pending.task.cancel()
+
+    async def _flush_later(self, chat_id: int, pending: PendingEdit):
+        await asyncio.sleep(self.delay)
+        await self._flush(chat_id, pending)
+
+    async def _flush(self, chat_id: int, pending: PendingEdit, reschedule: bool = True) -> Optional[float]:
+        if self._pending.get(chat_id) is not pending:
+            return None
+        del self._pending[chat_id]
+
+        if self._last_sent.get(chat_id) == (pending.message_id, pending.digest):
+            self.edits_skipped += 1
+            return None
+
+        try:
+            await pending.bot.edit_message_text(
+                chat_id=chat_id,
+                message_id=pending.message_id,
+                text=pending.text,
+                reply_markup=pending.reply_markup,
+                parse_mode=pending.parse_mode
+            )
+        except TelegramRetryAfter as e:
+            if not reschedule:
+                return e.retry_after
+            logger.warning(f"Flood control while editing message {pending.message_id} in chat {chat_id}, retrying in {e.retry_after}s.")
+            if chat_id not in self._pending:
+                self._pending[chat_id] = pending
+                pending.task = asyncio.create_task(self._retry_later(chat_id, pending, e.retry_after))
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to edit message {pending.message_id} in chat {chat_id}: {e}")
+            return None
+
+        self.edits_sent += 1
+        self._last_sent[chat_id] = (pending.message_id, pending.digest)
+        self._last_sent.move_to_end(chat_id)
+        while len(self._last_sent) > self.max_tracked_chats:
+            self._last_sent.popitem(last=False)
+        return None
+
+    async def _retry_later(self, chat_id: int, pending: PendingEdit, retry_after: float):
+        await asyncio.sleep(retry_after)
+        await self._flush(chat_id, pending)
+
+
+message_renderer = MessageRenderer(delay=settings.render_coalesce_delay)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, TypeVar
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RenderPool:
+    def __init__(self, backend: str, workers: int, max_queue: int):
+        self.backend = backend
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.process_renders = 0
+        self.thread_renders = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._initializer: Optional[Callable[[], Any]] = None
+
+    def start(self, initializer: Optional[Callable[[], Any]] = None):
+        if self.backend != "process" or self._executor is not None:
+            return
+        if multiprocessing.current_process().daemon:
+            # Supervisor workers are daemonic and cannot spawn children; they render in threads instead.
+            logger.warning("Process render backend is unavailable in a daemonic worker, using threads.")
+            return
+        self._initializer = initializer
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initializer
+        )
+        logger.info(f"Started {self.workers} render processes (queue limit {self.max_queue}).")
+
+    async def render(self, fn: Callable[..., T], *args: Any) -> T:
+        # Past the queue limit a render would only wait for a busy process; the thread path starts it right away.
+        executor = self._executor
+        if executor is None or self.pending >= self.max_queue:
+            self.thread_renders += 1
+            return await asyncio.to_thread(fn, *args)
+
+        self.pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            self.process_renders += 1
+            return result
+        except BrokenProcessPool as e:
+            # Every in-flight render sees the same breakage; only the first one replaces the pool it was submitted to.
+            if self._executor is executor:
+                logger.error(f"Render process pool broke, restarting it: {e}")
+                self._restart()
+            self.thread_renders += 1
+            return await asyncio.to_thread(fn, *args)
+        finally:
+            self.pending -= 1
+
+    def _restart(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.start(self._initializer)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            logger.info(f"Render pool stopped: {self.process_renders} process renders, {self.thread_renders} thread renders.")
+
+
+render_pool = RenderPool(settings.render_backend, settings.render_workers, settings.render_max_queue)
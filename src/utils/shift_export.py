@@ -0,0 +1,105 @@
+import csv
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Shift, ShiftStatus
+from src.db.statistics import PeriodTotals
+
+logger = logging.getLogger(__name__)
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_BATCH_SIZE = 500
+EXPORT_FIELDS = [
+    "shift_id", "start_time", "end_time", "duration_hours", "orders_count", "total_mileage",
+    "rate", "order_rate", "mileage_rate", "revenue_from_time", "revenue_from_orders", "total_tips",
+    "gross_income", "tax_amount", "food_expenses", "other_expenses", "mileage_cost",
+    "operational_expenses", "net_profit",
+]
+EXPORT_COLUMNS = [
+    Shift.id, Shift.start_time, Shift.end_time, Shift.orders_count, Shift.total_mileage, Shift.total_tips,
+    Shift.food_expenses, Shift.other_expenses, Shift.rate, Shift.order_rate, Shift.mileage_rate,
+]
+
+
+def _local_isoformat(moment: Optional[datetime]) -> Optional[str]:
+    if moment is None:
+        return None
+    moment = moment.replace(tzinfo=MOSCOW_TZ) if moment.tzinfo is None else moment.astimezone(MOSCOW_TZ)
+    return moment.isoformat(timespec="seconds")
+
+
+def export_record(row) -> Dict[str, Any]:
+    totals = PeriodTotals.from_shift(row)
+    return {
+        "shift_id": row.id,
+        "start_time": _local_isoformat(row.start_time),
+        "end_time": _local_isoformat(row.end_time),
+        "duration_hours": round(totals.duration_hours, 2),
+        "orders_count": totals.orders_count,
+        "total_mileage": round(totals.total_mileage, 2),
+        "rate": row.rate or 0.0,
+        "order_rate": row.order_rate or 0.0,
+        "mileage_rate": row.mileage_rate or 0.0,
+        "revenue_from_time": round(totals.revenue_from_time, 2),
+        "revenue_from_orders": round(totals.revenue_from_orders, 2),
+        "total_tips": round(totals.total_tips, 2),
+        "gross_income": round(totals.gross_income, 2),
+        "tax_amount": round(totals.tax_amount, 2),
+        "food_expenses": round(totals.food_expenses, 2),
+        "other_expenses": round(totals.other_expenses, 2),
+        "mileage_cost": round(totals.mileage_cost, 2),
+        "operational_expenses": round(totals.operational_expenses, 2),
+        "net_profit": round(totals.net_profit, 2),
+    }
+
+
+async def stream_completed_shifts(session: AsyncSession, user_id: int) -> AsyncIterator[Any]:
+    # Plain column rows through a server-side cursor: only one batch is held in memory, and no ORM identity map grows.
+    stmt = select(*EXPORT_COLUMNS).where(
+        Shift.user_id == user_id,
+        Shift.status == ShiftStatus.COMPLETED
+    ).order_by(Shift.end_time.asc(), Shift.id.asc()).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    result = await session.stream(stmt)
+    async for row in result:
+        yield row
+
+
+async def export_shift_history(session: AsyncSession, user_id: int, export_format: str) -> Optional[str]:
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    # Rows go straight to a temp file; the caller sends it as a document and removes it.
+    fd, path = tempfile.mkstemp(prefix=f"shifts_{user_id}_", suffix=f".{export_format}")
+    exported = 0
+    try:
+        # utf-8-sig lets Excel detect the encoding of the CSV.
+        with os.fdopen(fd, "w", encoding="utf-8-sig" if export_format == "csv" else "utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS) if export_format == "csv" else None
+            if writer:
+                writer.writeheader()
+            async for row in stream_completed_shifts(session, user_id):
+                record = export_record(row)
+                if writer:
+                    writer.writerow(record)
+                else:
+                    file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                exported += 1
+    except Exception:
+        os.unlink(path)
+        raise
+
+    logger.info(f"Exported {exported} shifts for user {user_id} as {export_format}.")
+    if exported == 0:
+        os.unlink(path)
+        return None
+    return path
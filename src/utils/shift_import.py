@@ -0,0 +1,243 @@
+import asyncio
+import csv
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import cast, func, select
+from sqlalchemy.dialects.postgresql import REGCLASS
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.db.models import Shift, ShiftEventType, ShiftStatus
+from src.db.rollups import rebuild_daily_stats
+from src.db.statistics import PeriodTotals
+from src.utils.text_manager import text_manager as tm
+
+logger = logging.getLogger(__name__)
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ROWS = 20000
+IMPORT_MAX_FILE_SIZE = 20 * 1024 * 1024
+IMPORT_MAX_REPORTED_ERRORS = 10
+IMPORT_REQUIRED_FIELDS = ("start_time", "end_time")
+IMPORT_NUMERIC_FIELDS = (
+    "orders_count", "total_mileage", "total_tips", "food_expenses", "other_expenses",
+    "rate", "order_rate", "mileage_rate",
+)
+IMPORT_DATETIME_FORMATS = ("%d.%m.%Y %H:%M", "%d.%m.%Y %H:%M:%S")
+
+SHIFT_COPY_COLUMNS = [
+    "id", "user_id", "status", "orders_count", "total_mileage", "total_tips", "total_expenses",
+    "food_expenses", "other_expenses", "net_profit", "rate", "order_rate", "mileage_rate",
+    "start_time", "end_time",
+]
+EVENT_COPY_COLUMNS = ["shift_id", "event_type", "timestamp", "details", "amount", "category_code", "count", "distance_km"]
+
+
+class ShiftImportError(Exception):
+    def __init__(self, errors: List[str], rows: int = 0):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+        self.rows = rows
+
+
+@dataclass
+class ImportedShift:
+    start_time: datetime
+    end_time: datetime
+    orders_count: int = 0
+    total_mileage: float = 0.0
+    total_tips: float = 0.0
+    food_expenses: float = 0.0
+    other_expenses: float = 0.0
+    rate: float = 0.0
+    order_rate: float = 0.0
+    mileage_rate: float = 0.0
+
+
+def _parse_datetime(value: str) -> datetime:
+    value = value.strip()
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        for date_format in IMPORT_DATETIME_FORMATS:
+            try:
+                moment = datetime.strptime(value, date_format)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"не удалось разобрать дату '{value}'")
+    return moment.replace(tzinfo=MOSCOW_TZ) if moment.tzinfo is None else moment
+
+
+def _parse_number(name: str, value: Optional[str]) -> float:
+    value = (value or "").strip().replace(" ", "").replace(",", ".")
+    if not value:
+        return 0.0
+    number = float(value)
+    if number < 0:
+        raise ValueError(f"{name} не может быть отрицательным")
+    return number
+
+
+def _parse_row(row: Dict[str, str], now: datetime) -> ImportedShift:
+    start_time = _parse_datetime(row["start_time"])
+    end_time = _parse_datetime(row["end_time"])
+    if end_time <= start_time:
+        raise ValueError("end_time раньше start_time")
+    if end_time > now:
+        raise ValueError("end_time в будущем")
+    values = {name: _parse_number(name, row.get(name)) for name in IMPORT_NUMERIC_FIELDS}
+    values["orders_count"] = int(values["orders_count"])
+    return ImportedShift(start_time, end_time, **values)
+
+
+def iter_import_rows(path: str) -> Iterator[Tuple[int, Union[ImportedShift, str]]]:
+    now = datetime.now(MOSCOW_TZ)
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        reader = csv.DictReader(file)
+        missing = [name for name in IMPORT_REQUIRED_FIELDS if name not in (reader.fieldnames or [])]
+        if missing:
+            yield 1, f"нет обязательных колонок: {', '.join(missing)}"
+            return
+        for row in reader:
+            try:
+                yield reader.line_num, _parse_row(row, now)
+            except (ValueError, TypeError, AttributeError) as e:
+                yield reader.line_num, str(e)
+
+
+def parse_import_file(path: str) -> List[ImportedShift]:
+    shifts: List[ImportedShift] = []
+    errors: List[str] = []
+    try:
+        for line_num, parsed in iter_import_rows(path):
+            if isinstance(parsed, str):
+                errors.append(f"строка {line_num}: {parsed}")
+            else:
+                shifts.append(parsed)
+            if len(shifts) + len(errors) > IMPORT_MAX_ROWS:
+                raise ShiftImportError([f"в файле больше {IMPORT_MAX_ROWS} строк"], len(shifts))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ShiftImportError([f"файл не похож на CSV в кодировке UTF-8 ({e})"], len(shifts))
+    if errors:
+        raise ShiftImportError(errors[:IMPORT_MAX_REPORTED_ERRORS], len(shifts))
+    if not shifts:
+        raise ShiftImportError(["в файле нет смен"])
+    return shifts
+
+
+async def read_import_file(path: str) -> List[ImportedShift]:
+    # Parsing is CPU-bound; a thread keeps other users' updates flowing while a large file is read.
+    return await asyncio.to_thread(parse_import_file, path)
+
+
+def _shift_record(shift_id: int, user_id: int, shift: ImportedShift) -> tuple:
+    return (
+        shift_id, user_id, ShiftStatus.COMPLETED.name, shift.orders_count, shift.total_mileage,
+        shift.total_tips, shift.food_expenses + shift.other_expenses, shift.food_expenses, shift.other_expenses,
+        PeriodTotals.from_shift(shift).net_profit, shift.rate, shift.order_rate, shift.mileage_rate,
+        shift.start_time, shift.end_time,
+    )
+
+
+def _event_record(shift_id: int, event_type: ShiftEventType, timestamp: datetime, details: dict,
+                  amount: Optional[float] = None, category_code: Optional[str] = None,
+                  count: Optional[int] = None, distance_km: Optional[float] = None) -> tuple:
+    return (
+        shift_id, event_type.name, timestamp, json.dumps(details, ensure_ascii=False),
+        amount, category_code, count, distance_km,
+    )
+
+
+def _event_records(shift_id: int, shift: ImportedShift) -> Iterator[tuple]:
+    end_time = shift.end_time
+    yield _event_record(shift_id, ShiftEventType.START_SHIFT, shift.start_time, {"message": "Смена начата", "imported": True})
+    if shift.orders_count:
+        count = shift.orders_count
+        yield _event_record(shift_id, ShiftEventType.ADD_ORDER, end_time, {"count": count, "description": f"{count} заказ(а)"}, count=count)
+    if shift.total_tips:
+        tips = shift.total_tips
+        yield _event_record(shift_id, ShiftEventType.ADD_TIPS, end_time, {"amount": tips, "currency": "RUB", "description": f"+{tips} руб."}, amount=tips)
+    for category_code in ("food", "other"):
+        amount = getattr(shift, f"{category_code}_expenses")
+        if amount:
+            category = tm.get(f"shift.expenses.categories.{category_code}", category_code)
+            yield _event_record(
+                shift_id, ShiftEventType.ADD_EXPENSE, end_time,
+                {"amount": amount, "category_code": category_code, "category": category, "description": f"-{amount} руб. ({category})"},
+                amount=amount, category_code=category_code
+            )
+    if shift.total_mileage:
+        distance = shift.total_mileage
+        yield _event_record(shift_id, ShiftEventType.ADD_MILEAGE, end_time, {"distance_km": distance, "description": f"{distance} км"}, distance_km=distance)
+    yield _event_record(shift_id, ShiftEventType.COMPLETE_SHIFT, end_time, {"message": "Смена завершена", "imported": True})
+
+
+def _batch_records(user_id: int, shift_ids: List[int], batch: List[ImportedShift]) -> Tuple[List[tuple], List[tuple]]:
+    shift_records = [_shift_record(shift_id, user_id, shift) for shift_id, shift in zip(shift_ids, batch)]
+    event_records = [record for shift_id, shift in zip(shift_ids, batch) for record in _event_records(shift_id, shift)]
+    return shift_records, event_records
+
+
+def _shift_key(start_time: datetime, end_time: datetime) -> Tuple[datetime, datetime]:
+    # Exports keep whole seconds, so shifts are matched at that precision.
+    return start_time.replace(microsecond=0), end_time.replace(microsecond=0)
+
+
+async def _existing_shift_keys(session: AsyncSession, user_id: int, shifts: List[ImportedShift]) -> Set[Tuple[datetime, datetime]]:
+    start_second = func.date_trunc("second", Shift.start_time)
+    end_second = func.date_trunc("second", Shift.end_time)
+    rows = await session.execute(
+        select(start_second, end_second).where(
+            Shift.user_id == user_id,
+            Shift.end_time.is_not(None),
+            Shift.start_time >= min(shift.start_time for shift in shifts) - timedelta(seconds=1),
+            Shift.start_time <= max(shift.start_time for shift in shifts) + timedelta(seconds=1),
+        )
+    )
+    return {_shift_key(start_time, end_time) for start_time, end_time in rows}
+
+
+def drop_duplicate_shifts(shifts: List[ImportedShift], existing: Set[Tuple[datetime, datetime]]) -> List[ImportedShift]:
+    seen = set(existing)
+    unique = []
+    for shift in shifts:
+        key = _shift_key(shift.start_time, shift.end_time)
+        if key not in seen:
+            seen.add(key)
+            unique.append(shift)
+    return unique
+
+
+async def import_shifts(session: AsyncSession, user_id: int, path: str) -> Tuple[int, int]:
+    parsed = await read_import_file(path)
+    # Re-uploading an export, or a file that overlaps an earlier import, must not double the history.
+    shifts = drop_duplicate_shifts(parsed, await _existing_shift_keys(session, user_id, parsed))
+    skipped = len(parsed) - len(shifts)
+    if not shifts:
+        logger.info(f"Import for user {user_id} skipped all {skipped} shifts as duplicates.")
+        return 0, skipped
+    shift_id_sequence = cast(func.pg_get_serial_sequence("shifts", "id"), REGCLASS)
+
+    for offset in range(0, len(shifts), IMPORT_BATCH_SIZE):
+        batch = shifts[offset:offset + IMPORT_BATCH_SIZE]
+        # Ids are allocated up front so the events can reference their shifts inside the same COPY batch.
+        shift_ids = (await session.execute(
+            select(func.nextval(shift_id_sequence)).select_from(func.generate_series(1, len(batch)))
+        )).scalars().all()
+        shift_records, event_records = await asyncio.to_thread(_batch_records, user_id, shift_ids, batch)
+
+        # The statement above opened the session's transaction, so COPY on the same connection joins it.
+        driver_connection = (await (await session.connection()).get_raw_connection()).driver_connection
+        await driver_connection.copy_records_to_table("shifts", columns=SHIFT_COPY_COLUMNS, records=shift_records)
+        await driver_connection.copy_records_to_table("shift_events", columns=EVENT_COPY_COLUMNS, records=event_records)
+
+    await rebuild_daily_stats(session, user_id)
+    logger.info(f"Imported {len(shifts)} shifts for user {user_id}, skipped {skipped} duplicates.")
+    return len(shifts), skipped
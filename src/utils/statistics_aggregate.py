@@ -0,0 +1,103 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable
+
+import numpy as np
+
+from src.db.statistics import PeriodTotals
+from src.utils.statistics_config import PROJECTION_CONFIG
+
+PROJECTION_KEYS = list(PROJECTION_CONFIG)
+PROJECTION_HOURS = np.array([PROJECTION_CONFIG[key]["hours"] for key in PROJECTION_KEYS], dtype=np.float64)
+
+AGGREGATE_COLUMNS = (
+    "start_epoch", "end_epoch", "orders_count", "total_mileage", "rate", "order_rate", "mileage_rate",
+    "total_tips", "food_expenses", "other_expenses",
+)
+
+
+def _column(values) -> np.ndarray:
+    # NULL columns arrive as None; they count as zero, like the coalesce() in the SQL totals.
+    return np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0)
+
+
+def _ratio(numerator: float, denominator: float, threshold: float = 0.0) -> float:
+    return numerator / denominator if denominator > threshold else 0.0
+
+
+def shift_columns(shifts: Iterable) -> Dict[str, np.ndarray]:
+    shifts = list(shifts)
+    columns = {
+        "start_epoch": [shift.start_time.timestamp() if shift.start_time else np.nan for shift in shifts],
+        "end_epoch": [shift.end_time.timestamp() if shift.end_time else np.nan for shift in shifts],
+    }
+    for name in AGGREGATE_COLUMNS[2:]:
+        columns[name] = [getattr(shift, name) for shift in shifts]
+    return {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+
+
+@dataclass(frozen=True)
+class StatisticsAggregate:
+    totals: PeriodTotals
+    avg_hours_per_shift: float = 0.0
+    avg_orders_per_hour: float = 0.0
+    avg_mileage_per_order: float = 0.0
+    avg_profit_per_hour: float = 0.0
+    avg_profit_per_km: float = 0.0
+    avg_profit_per_order: float = 0.0
+    projections: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def total_expenses(self) -> float:
+        return self.totals.operational_expenses + self.totals.tax_amount
+
+    @classmethod
+    def from_totals(cls, totals: PeriodTotals) -> "StatisticsAggregate":
+        hours = totals.duration_hours
+        net_profit = totals.net_profit
+        avg_profit_per_hour = _ratio(net_profit, hours, 0.001)
+        return cls(
+            totals=totals,
+            avg_hours_per_shift=_ratio(hours, totals.shifts_count),
+            avg_orders_per_hour=_ratio(totals.orders_count, hours, 0.001),
+            avg_mileage_per_order=_ratio(totals.total_mileage, totals.orders_count),
+            avg_profit_per_hour=avg_profit_per_hour,
+            avg_profit_per_km=_ratio(net_profit, totals.total_mileage, 0.001),
+            avg_profit_per_order=_ratio(net_profit, totals.orders_count),
+            projections=dict(zip(PROJECTION_KEYS, (PROJECTION_HOURS * avg_profit_per_hour).tolist())),
+        )
+
+    @classmethod
+    def from_columns(
+            cls,
+            start_epoch,
+            end_epoch,
+            orders_count,
+            total_mileage,
+            rate,
+            order_rate,
+            mileage_rate,
+            total_tips,
+            food_expenses,
+            other_expenses
+    ) -> "StatisticsAggregate":
+        # A missing start or end leaves NaN here, which zeroes that shift's duration as PeriodTotals.from_shift does.
+        duration_seconds = _column(np.maximum(np.asarray(end_epoch, dtype=np.float64) - np.asarray(start_epoch, dtype=np.float64), 0.0))
+        orders_count = _column(orders_count)
+        total_mileage = _column(total_mileage)
+        totals = PeriodTotals(
+            shifts_count=len(duration_seconds),
+            duration_seconds=float(duration_seconds.sum()),
+            orders_count=int(orders_count.sum()),
+            total_mileage=float(total_mileage.sum()),
+            revenue_from_time=float(duration_seconds @ _column(rate)) / 3600.0,
+            revenue_from_orders=float(orders_count @ _column(order_rate)),
+            total_tips=float(_column(total_tips).sum()),
+            food_expenses=float(_column(food_expenses).sum()),
+            other_expenses=float(_column(other_expenses).sum()),
+            mileage_cost=float(total_mileage @ _column(mileage_rate)),
+        )
+        return cls.from_totals(totals)
+
+    @classmethod
+    def from_shifts(cls, shifts: Iterable) -> "StatisticsAggregate":
+        return cls.from_columns(**shift_columns(shifts))
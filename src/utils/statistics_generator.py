@@ -1,18 +1,26 @@
-import asyncio
+import hashlib
 import io
+import json
 import logging
 import textwrap
-from typing import List, Optional
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, NamedTuple, Optional
 from datetime import datetime
 
 from PIL import Image, ImageDraw, ImageFont
 from zoneinfo import ZoneInfo
 
-from src.db.models import Shift, ShiftEventType, ShiftStatus
+from src.config import settings
+from src.db.statistics import PeriodTotals
+from src.utils.render_pool import render_pool
+from src.utils.statistics_aggregate import StatisticsAggregate
 from src.utils.text_manager import text_manager as tm
 from src.utils.statistics_config import (
     TEMPLATE_PATH, FONT_REGULAR_PATH, FONT_BOLD_PATH,
-    IMAGE_ELEMENT_STYLES, PROJECTION_CONFIG, TAX_RATE
+    IMAGE_ELEMENT_STYLES, PROJECTION_CONFIG
 )
 
 logger = logging.getLogger(__name__)
@@ -51,223 +59,329 @@ def get_hour_unit(hours: float) -> str:
         return tm.get("statistics.image.units.hour_genitive_plural", "часов")
 
 
-async def generate_statistics_image(
-        shifts: List[Shift],
-        period_name_str: str,
-        start_date_obj: Optional[datetime],
-        end_date_obj: datetime
-) -> Optional[io.BytesIO]:
-    if not TEMPLATE_PATH.exists():
-        logger.error(f"Template image not found at {TEMPLATE_PATH}")
-        return None
-    if not FONT_REGULAR_PATH.exists() or not FONT_BOLD_PATH.exists():
-        logger.error(f"Font files not found. Regular: {FONT_REGULAR_PATH}, Bold: {FONT_BOLD_PATH}")
+TEXT_REPORT_SECTIONS = (
+    ("time_shifts", (("total", "total_shifts_value"), ("total_hours", "total_hours_value"), ("avg_hours_in_shifts", "avg_hours_value"))),
+    ("orders", (("total", "total_orders_value"), ("orders_speed", "orders_speed_value"), ("mileage_per_order", "mileage_order_value"))),
+    ("expenses", (("total", "total_exp_value"), ("food", "food_exp_value"), ("tax", "tax_exp_value"),
+                  ("mileage_cost", "mileage_exp_value"), ("other", "other_exp_value"))),
+    ("revenue", (("total", "total_rev_value"), ("hours_revenue", "hours_rev_value"), ("orders_revenue", "orders_rev_value"),
+                 ("tips_revenue", "tips_rev_value"))),
+    ("profit", (("total", "total_profit_value"), ("profit_per_hour", "profit_hr_value"), ("profit_per_km", "profit_km_value"),
+                ("profit_per_order", "profit_order_value"))),
+)
+
+# Output format name -> (Pillow format, file extension).
+IMAGE_FORMATS = {
+    "png": ("PNG", "png"),
+    "png_palette": ("PNG", "png"),
+    "jpeg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp"),
+}
+
+
+@dataclass
+class EncodeStats:
+    count: int = 0
+    total_seconds: float = 0.0
+    total_bytes: int = 0
+
+    def record(self, seconds: float, size: int):
+        self.count += 1
+        self.total_seconds += seconds
+        self.total_bytes += size
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_seconds / self.count * 1000 if self.count else 0.0
+
+    @property
+    def avg_bytes(self) -> float:
+        return self.total_bytes / self.count if self.count else 0.0
+
+
+class EncodedImage(NamedTuple):
+    data: bytes
+    image_format: str
+    seconds: float
+
+
+class StatisticsImageRenderer:
+    def __init__(self, image_format: str = "png", quality: int = 85):
+        if image_format not in IMAGE_FORMATS:
+            logger.error(f"Unknown statistics image format {image_format}, using png.")
+            image_format = "png"
+        self.image_format = image_format
+        self.quality = quality
+        self.encode_stats: Dict[str, EncodeStats] = defaultdict(EncodeStats)
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._base: Optional[Image.Image] = None
+        self._signature: Optional[tuple] = None
+        self._generation = 0
+        self._fonts = threading.local()
+        self._buffers = threading.local()
+
+    @property
+    def file_extension(self) -> str:
+        return IMAGE_FORMATS[self.image_format][1]
+
+    def _asset_signature(self) -> tuple:
+        return tuple(
+            (str(path), path.stat().st_mtime_ns)
+            for path in (TEMPLATE_PATH, FONT_REGULAR_PATH, FONT_BOLD_PATH, tm.file_path)
+        )
+
+    @property
+    def version(self) -> str:
+        try:
+            signature = self._asset_signature()
+        except OSError:
+            return ""
+        return hashlib.sha1(repr((signature, self.image_format, self.quality)).encode()).hexdigest()
+
+    def _get_font(self, font_type: str, size: int) -> ImageFont.FreeTypeFont:
+        # FreeType faces must not be shared between threads, so each render thread keeps its own.
+        if getattr(self._fonts, "generation", None) != self._generation:
+            self._fonts.generation, self._fonts.cache = self._generation, {}
+        cache = self._fonts.cache
+        cache_key = (font_type, size)
+        if cache_key not in cache:
+            font_path = FONT_BOLD_PATH if font_type == "bold" else FONT_REGULAR_PATH
+            try:
+                cache[cache_key] = ImageFont.truetype(str(font_path), size)
+            except IOError:
+                logger.error(f"Could not load font: {font_path}. Falling back to default.")
+                return ImageFont.load_default()
+        return cache[cache_key]
+
+    @staticmethod
+    def _static_text(key: str, config: dict) -> Optional[str]:
+        if key == "period_title":
+            return None
+        if key == "footer_text":
+            return tm.get(config["text_key"], default="") if config.get("text_key") else ""
+        if "text_key" in config:
+            return tm.get(config["text_key"], "")
+        if key.startswith("proj") and key.endswith("_label"):
+            return tm.get(PROJECTION_CONFIG[f"proj{key[4]}"]["text_key"], "")
+        if key.startswith("proj") and key.endswith("_hours"):
+            hours = PROJECTION_CONFIG[f"proj{key[4]}"]["hours"]
+            return f"{int(round(hours))} {get_hour_unit(hours)}"
         return None
 
-    total_shifts_count = 0
-    total_duration_seconds = 0.0
-    total_orders_completed = 0
-    total_mileage_sum = 0.0
-    period_gross_income = 0.0
-    period_revenue_from_time = 0.0
-    period_revenue_from_orders = 0.0
-    period_total_tips = 0.0
-    period_food_expenses = 0.0
-    period_other_expenses = 0.0
-    period_mileage_cost = 0.0
-
-    valid_shifts = [s for s in shifts if s.start_time and s.end_time and s.status == ShiftStatus.COMPLETED]
-    total_shifts_count = len(valid_shifts)
-
-    for shift in valid_shifts:
-        start_local = shift.start_time.astimezone(MOSCOW_TZ) if shift.start_time.tzinfo else shift.start_time.replace(
-            tzinfo=MOSCOW_TZ)
-        end_local = shift.end_time.astimezone(MOSCOW_TZ) if shift.end_time.tzinfo else shift.end_time.replace(
-            tzinfo=MOSCOW_TZ)
-
-        duration_this_shift = (end_local - start_local).total_seconds()
-        if duration_this_shift < 0: duration_this_shift = 0
-        total_duration_seconds += duration_this_shift
-        duration_hours_this_shift = duration_this_shift / 3600.0
-
-        orders_this_shift = shift.orders_count or 0
-        total_orders_completed += orders_this_shift
-        mileage_this_shift = shift.total_mileage or 0.0
-        total_mileage_sum += mileage_this_shift
-
-        rate = shift.rate or 0.0
-        order_rate = shift.order_rate or 0.0
-        revenue_time_this_shift = duration_hours_this_shift * rate
-        period_revenue_from_time += revenue_time_this_shift
-        revenue_orders_this_shift = orders_this_shift * order_rate
-        period_revenue_from_orders += revenue_orders_this_shift
-        tips_this_shift = shift.total_tips or 0.0
-        period_total_tips += tips_this_shift
-
-        period_gross_income += (revenue_time_this_shift + revenue_orders_this_shift + tips_this_shift)
-
-        mileage_rate_this_shift = shift.mileage_rate or 0.0
-        mileage_cost_this_shift = mileage_this_shift * mileage_rate_this_shift
-        period_mileage_cost += mileage_cost_this_shift
-
-        food_exp_this_shift = 0.0
-        other_exp_this_shift = 0.0
-        if hasattr(shift, 'events') and shift.events:
-            for event in shift.events:
-                if event.event_type == ShiftEventType.ADD_EXPENSE and isinstance(event.details, dict):
-                    amount = float(event.details.get("amount", 0.0))
-                    category_code = event.details.get("category_code", "other")
-                    if category_code == "food":
-                        food_exp_this_shift += amount
-                    elif category_code == "other":
-                        other_exp_this_shift += amount
-        period_food_expenses += food_exp_this_shift
-        period_other_expenses += other_exp_this_shift
-
-    period_tax_amount = period_gross_income * TAX_RATE
-    total_period_expenses_operational = period_food_expenses + period_other_expenses + period_mileage_cost
-    period_net_profit = period_gross_income - total_period_expenses_operational - period_tax_amount
-
-    total_duration_hours = total_duration_seconds / 3600.0
-
-    avg_hours_per_shift = total_duration_hours / total_shifts_count if total_shifts_count > 0 else 0.0
-    avg_orders_per_hour = total_orders_completed / total_duration_hours if total_duration_hours > 0.001 else 0.0
-    avg_mileage_per_order = total_mileage_sum / total_orders_completed if total_orders_completed > 0 else 0.0
-
-    total_expenses_display = total_period_expenses_operational + period_tax_amount
-
-    avg_profit_per_hour = period_net_profit / total_duration_hours if total_duration_hours > 0.001 else 0.0
-    avg_profit_per_km = period_net_profit / total_mileage_sum if total_mileage_sum > 0.001 else 0.0
-    avg_profit_per_order = period_net_profit / total_orders_completed if total_orders_completed > 0 else 0.0
+    def _draw_element(self, draw: ImageDraw.ImageDraw, config: dict, text_to_draw: str):
+        font = self._get_font(config["font_type"], config["size"])
+        if "max_width_chars" not in config:
+            draw.text(config["pos"], text_to_draw, font=font, fill=config["color"], anchor=config.get("anchor", "ls"))
+            return
+
+        line_spacing = config.get("line_spacing", 0)
+        wrapped_lines = textwrap.wrap(text_to_draw, width=config["max_width_chars"], break_long_words=False,
+                                      replace_whitespace=False) if text_to_draw else []
+        ascent, descent = font.getmetrics()
+        current_y = config["pos"][1]
+        for line in wrapped_lines:
+            draw.text((config["pos"][0], current_y), line, font=font, fill=config["color"],
+                      anchor=config.get("anchor", "ls"))
+            current_y += ascent + descent + line_spacing
+
+    def _base_layer(self) -> Image.Image:
+        signature = self._asset_signature()
+        if signature == self._signature and self._base is not None:
+            return self._base
+        with self._lock:
+            if signature != self._signature or self._base is None:
+                tm.reload_if_changed()
+                self._generation += 1
+                with Image.open(TEMPLATE_PATH) as template:
+                    base = template.convert("RGBA")
+                if base.getchannel("A").getextrema()[0] == 255:
+                    # A fully opaque template needs no alpha: RGB is cheaper to copy, draw on and encode.
+                    base = base.convert("RGB")
+                draw = ImageDraw.Draw(base)
+                for key, config in IMAGE_ELEMENT_STYLES.items():
+                    static_text = self._static_text(key, config)
+                    if static_text is not None:
+                        self._draw_element(draw, config, static_text)
+                self._base, self._signature = base, signature
+                logger.info("Statistics image base layer rebuilt.")
+        return self._base
+
+    def preload(self):
+        self._base_layer()
+        for config in IMAGE_ELEMENT_STYLES.values():
+            self._get_font(config["font_type"], config["size"])
+
+    def render(self, data_for_template: dict, period_name_str: str) -> Optional[EncodedImage]:
+        try:
+            # Labels, headers and projection rows are already on the base layer; only values are drawn per request.
+            img = self._base_layer().copy()
+            draw = ImageDraw.Draw(img)
+
+            for key, config in IMAGE_ELEMENT_STYLES.items():
+                if key == "period_title":
+                    self._draw_element(draw, config, statistics_period_title(data_for_template, period_name_str))
+                elif self._static_text(key, config) is None:
+                    self._draw_element(draw, config, str(data_for_template.get(key, "")))
+
+            return self.encode(img)
+
+        except Exception as e:
+            logger.error(f"Error generating statistics image: {e}", exc_info=True)
+            return None
 
+    def _output_buffer(self) -> io.BytesIO:
+        # One buffer per render thread, rewound for every image instead of allocating a new one.
+        buffer = getattr(self._buffers, "buffer", None)
+        if buffer is None:
+            buffer = self._buffers.buffer = io.BytesIO()
+        buffer.seek(0)
+        buffer.truncate()
+        return buffer
+
+    def encode(self, img: Image.Image, image_format: Optional[str] = None) -> EncodedImage:
+        image_format = image_format or self.image_format
+        started = time.perf_counter()
+        buffer = self._output_buffer()
+        if image_format == "png_palette":
+            img.quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(buffer, format="PNG", optimize=True)
+        elif image_format == "jpeg":
+            img.convert("RGB").save(buffer, format="JPEG", quality=self.quality, optimize=True)
+        elif image_format == "webp":
+            img.save(buffer, format="WEBP", quality=self.quality, method=4)
+        else:
+            img.save(buffer, format="PNG")
+        return EncodedImage(buffer.getvalue(), image_format, time.perf_counter() - started)
+
+    def record_encode(self, image: EncodedImage):
+        # Called in the bot process with the result a render thread or process sent back, so the
+        # stats cover every render and concurrent threads cannot lose updates.
+        with self._stats_lock:
+            stats = self.encode_stats[image.image_format]
+            stats.record(image.seconds, len(image.data))
+            avg_bytes, avg_ms, count = stats.avg_bytes, stats.avg_ms, stats.count
+        logger.info(
+            f"Encoded statistics image as {image.image_format}: {len(image.data)} bytes in {image.seconds * 1000:.1f} ms "
+            f"(avg {avg_bytes:.0f} bytes, {avg_ms:.1f} ms over {count})."
+        )
+
+
+statistics_renderer = StatisticsImageRenderer(settings.statistics_image_format, settings.statistics_image_quality)
+
+
+def preload_render_assets():
+    statistics_renderer.preload()
+
+
+def render_statistics_image(data_for_template: dict, period_name_str: str) -> Optional[EncodedImage]:
+    return statistics_renderer.render(data_for_template, period_name_str)
+
+
+def build_statistics_template_data(
+        aggregate: StatisticsAggregate,
+        period_name_str: str,
+        start_date_obj: Optional[datetime],
+        end_date_obj: datetime
+) -> dict:
+    totals = aggregate.totals
     data_for_template = {
         "period_name": period_name_str,
         "start_date": start_date_obj.strftime('%d.%m') if start_date_obj else "",
         "end_date": end_date_obj.strftime('%d.%m') if end_date_obj else "",
 
-        "total_shifts_value": format_value(total_shifts_count, "statistics.image.units.shifts"),
-        "total_hours_value": format_value(total_duration_hours, precision=0),
-        "avg_hours_value": format_value(avg_hours_per_shift, precision=0),
-
-        "total_orders_value": format_value(total_orders_completed),
-        "orders_speed_value": format_value(avg_orders_per_hour, "statistics.image.units.orders_per_hour_unit",precision=0),
-        "mileage_order_value": format_value(avg_mileage_per_order, "statistics.image.units.km_per_order_unit",precision=0),
-
-        "total_exp_value": format_currency(total_expenses_display),
-        "food_exp_value": format_currency(period_food_expenses),
-        "tax_exp_value": format_currency(period_tax_amount),
-        "mileage_exp_value": format_currency(period_mileage_cost),
-        "other_exp_value": format_currency(period_other_expenses),
-
-        "total_rev_value": format_currency(period_gross_income),
-        "hours_rev_value": format_currency(period_revenue_from_time),
-        "orders_rev_value": format_currency(period_revenue_from_orders),
-        "tips_rev_value": format_currency(period_total_tips),
-
-        "total_profit_value": format_currency(period_net_profit),
-        "profit_hr_value": format_currency(avg_profit_per_hour),
-        "profit_km_value": format_value(avg_profit_per_km, "statistics.image.units.rub_per_km_unit", precision=0),
-        "profit_order_value": format_value(avg_profit_per_order, "statistics.image.units.rub_per_order_unit",
+        "total_shifts_value": format_value(totals.shifts_count, "statistics.image.units.shifts"),
+        "total_hours_value": format_value(totals.duration_hours, precision=0),
+        "avg_hours_value": format_value(aggregate.avg_hours_per_shift, precision=0),
+
+        "total_orders_value": format_value(totals.orders_count),
+        "orders_speed_value": format_value(aggregate.avg_orders_per_hour, "statistics.image.units.orders_per_hour_unit",precision=0),
+        "mileage_order_value": format_value(aggregate.avg_mileage_per_order, "statistics.image.units.km_per_order_unit",precision=0),
+
+        "total_exp_value": format_currency(aggregate.total_expenses),
+        "food_exp_value": format_currency(totals.food_expenses),
+        "tax_exp_value": format_currency(totals.tax_amount),
+        "mileage_exp_value": format_currency(totals.mileage_cost),
+        "other_exp_value": format_currency(totals.other_expenses),
+
+        "total_rev_value": format_currency(totals.gross_income),
+        "hours_rev_value": format_currency(totals.revenue_from_time),
+        "orders_rev_value": format_currency(totals.revenue_from_orders),
+        "tips_rev_value": format_currency(totals.total_tips),
+
+        "total_profit_value": format_currency(totals.net_profit),
+        "profit_hr_value": format_currency(aggregate.avg_profit_per_hour),
+        "profit_km_value": format_value(aggregate.avg_profit_per_km, "statistics.image.units.rub_per_km_unit", precision=0),
+        "profit_order_value": format_value(aggregate.avg_profit_per_order, "statistics.image.units.rub_per_order_unit",
                                            precision=0),
     }
 
     for proj_key, proj_data in PROJECTION_CONFIG.items():
-        config_hours = proj_data["hours"]
-        projected_income = avg_profit_per_hour * config_hours
-        data_for_template[f"{proj_key}_hours_val_raw"] = config_hours
-        data_for_template[f"{proj_key}_income_val"] = format_currency(projected_income)
+        data_for_template[f"{proj_key}_hours_val_raw"] = proj_data["hours"]
+        data_for_template[f"{proj_key}_income_val"] = format_currency(aggregate.projections[proj_key])
 
-    def _generate_image_sync_worker(_data_for_template: dict, _period_name_str: str) -> Optional[io.BytesIO]:
-        try:
-            img = Image.open(TEMPLATE_PATH).convert("RGBA")
-            draw = ImageDraw.Draw(img)
+    return data_for_template
 
-            fonts_cache = {}
-
-            def get_font(font_type, size):
-                cache_key = (font_type, size)
-                if cache_key in fonts_cache:
-                    return fonts_cache[cache_key]
-                font_path = FONT_BOLD_PATH if font_type == "bold" else FONT_REGULAR_PATH
-                try:
-                    font = ImageFont.truetype(str(font_path), size)
-                    fonts_cache[cache_key] = font
-                    return font
-                except IOError:
-                    logger.error(f"Could not load font: {font_path}. Falling back to default.")
-                    return ImageFont.load_default()
 
-            for key, config in IMAGE_ELEMENT_STYLES.items():
-                text_to_draw = ""
-                font = get_font(config["font_type"], config["size"])
-
-                if key == "period_title" or (
-                        key == "footer_text" and "max_width_chars" in config):
-                    full_text = ""
-                    if key == "period_title":
-                        if period_name_str == tm.get("statistics.prompts.all_time"):
-                            text_key_to_use = config["text_key_all_time"]
-                        elif data_for_template["start_date"] and data_for_template["end_date"]:
-                            text_key_to_use = config["text_key_date_range"]
-                        elif data_for_template["end_date"]:
-                            text_key_to_use = config["text_key_to_date"]
-                        else:
-                            text_key_to_use = config.get("text_key_all_time",
-                                                         "statistics.image.period_title_format_all_time")
-                        full_text = tm.get(text_key_to_use, default="Статистика").format(**data_for_template)
-
-                    elif key == "footer_text":
-                        text_key_from_config = config.get("text_key")
-                        if text_key_from_config:
-                            full_text = tm.get(text_key_from_config, default="")
-
-                    max_width_chars = config.get("max_width_chars", 100)
-                    line_spacing = config.get("line_spacing", 0)
-                    anchor_to_use = config.get("anchor", "ls")
-
-                    wrapped_lines = textwrap.wrap(full_text, width=max_width_chars, break_long_words=False,
-                                                  replace_whitespace=False) if full_text else []
-
-                    current_y = config["pos"][1]
-
-                    for i, line in enumerate(wrapped_lines):
-                        draw.text((config["pos"][0], current_y), line, font=font, fill=config["color"],
-                                  anchor=anchor_to_use)
-                        ascent, descent = font.getmetrics()
-                        line_height_metric = ascent + descent
-                        if i < len(wrapped_lines) - 1:
-                            current_y += line_height_metric + line_spacing
-                        else:
-                            current_y += line_height_metric
-                    continue
-
-                elif "text_key" in config:
-                    text_to_draw = tm.get(config["text_key"], "")
-                elif key.startswith("proj") and key.endswith("_label"):
-                    proj_num_str = key[4]
-                    text_to_draw = tm.get(PROJECTION_CONFIG[f"proj{proj_num_str}"]["text_key"], "")
-                elif key.startswith("proj") and key.endswith("_hours"):
-                    proj_num_str = key[4]
-                    hours_val_raw = data_for_template.get(f"proj{proj_num_str}_hours_val_raw", 0.0)
-                    text_to_draw = f"{int(round(hours_val_raw))} {get_hour_unit(hours_val_raw)}"
-                else:
-                    text_to_draw = str(data_for_template.get(key, ""))
-
-                draw.text(config["pos"], text_to_draw, font=font, fill=config["color"], anchor=config.get("anchor", "ls"))
-
-            img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='PNG')
-            img_byte_arr.seek(0)
-            return img_byte_arr
+def statistics_period_title(data_for_template: dict, period_name_str: str) -> str:
+    config = IMAGE_ELEMENT_STYLES["period_title"]
+    if period_name_str == tm.get("statistics.prompts.all_time"):
+        text_key_to_use = config["text_key_all_time"]
+    elif data_for_template["start_date"] and data_for_template["end_date"]:
+        text_key_to_use = config["text_key_date_range"]
+    elif data_for_template["end_date"]:
+        text_key_to_use = config["text_key_to_date"]
+    else:
+        text_key_to_use = config.get("text_key_all_time", "statistics.image.period_title_format_all_time")
+    return tm.get(text_key_to_use, default="Статистика").format(**data_for_template)
 
-        except Exception as e:
-            logger.error(f"Error generating statistics image: {e}", exc_info=True)
-            return None
 
-    image_bytes_io = await asyncio.to_thread(
-        _generate_image_sync_worker,
-        data_for_template,
-        period_name_str,
-    )
+def format_statistics_text_report(data_for_template: dict, period_name_str: str) -> str:
+    # Built from the same template data as the image, so the fallback never disagrees with a rendered picture.
+    lines = [f"<b>{statistics_period_title(data_for_template, period_name_str)}</b>"]
+    for header_key, rows in TEXT_REPORT_SECTIONS:
+        lines.append("")
+        lines.append(f"<b>{tm.get(f'statistics.image.headers.{header_key}', '')}</b>")
+        for label_key, value_key in rows:
+            lines.append(f"{tm.get(f'statistics.image.labels.{label_key}', '')} {data_for_template[value_key]}")
+
+    lines.append("")
+    lines.append(f"<b>{tm.get('statistics.image.projection.title', '')}</b>")
+    for proj_key, proj_data in PROJECTION_CONFIG.items():
+        hours = proj_data["hours"]
+        lines.append(f"{tm.get(proj_data['text_key'], '')} ({int(round(hours))} {get_hour_unit(hours)}): "
+                     f"{data_for_template[f'{proj_key}_income_val']}")
+    return "\n".join(lines)
+
+
+def statistics_image_cache_key(data_for_template: dict, period_name_str: str) -> str:
+    # The image is a pure function of the template data and the assets, so equal keys mean identical images.
+    payload = json.dumps([data_for_template, period_name_str, statistics_renderer.version], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
 
-    return image_bytes_io
\ No newline at end of file
+async def render_statistics_data(data_for_template: dict, period_name_str: str) -> Optional[io.BytesIO]:
+    if not TEMPLATE_PATH.exists():
+        logger.error(f"Template image not found at {TEMPLATE_PATH}")
+        return None
+    if not FONT_REGULAR_PATH.exists() or not FONT_BOLD_PATH.exists():
+        logger.error(f"Font files not found. Regular: {FONT_REGULAR_PATH}, Bold: {FONT_BOLD_PATH}")
+        return None
+
+    image = await render_pool.render(render_statistics_image, data_for_template, period_name_str)
+    if image is None:
+        return None
+    statistics_renderer.record_encode(image)
+    return io.BytesIO(image.data)
+
+
+async def generate_statistics_image(
+        totals: PeriodTotals,
+        period_name_str: str,
+        start_date_obj: Optional[datetime],
+        end_date_obj: datetime
+) -> Optional[io.BytesIO]:
+    tm.reload_if_changed()
+    data_for_template = build_statistics_template_data(
+        StatisticsAggregate.from_totals(totals), period_name_str, start_date_obj, end_date_obj
+    )
+    return await render_statistics_data(data_for_template, period_name_str)
@@ -10,8 +10,24 @@ TEXTS_FILE = Path(__file__).parent / "locales" / "texts.yaml"
 class TextManager:
     def __init__(self, file_path: Path = TEXTS_FILE):
         self.file_path = file_path
+        self.loaded_mtime_ns = self._mtime_ns()
         self.texts = self._load_texts()
 
+    def _mtime_ns(self) -> Optional[int]:
+        try:
+            return self.file_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        mtime_ns = self._mtime_ns()
+        if mtime_ns == self.loaded_mtime_ns:
+            return False
+        self.loaded_mtime_ns = mtime_ns
+        self.texts = self._load_texts()
+        logger.info(f"Reloaded texts from {self.file_path}")
+        return True
+
     def _load_texts(self) -> dict:
         try:
             with open(self.file_path, "r", encoding="utf-8") as f:
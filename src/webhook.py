@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import signal
+from typing import Any, Dict, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookUpdateHandler:
+    def __init__(self, dp: Dispatcher, bot: Bot, max_in_flight: int, secret_token: Optional[str] = None):
+        self.dp = dp
+        self.bot = bot
+        self.max_in_flight = max_in_flight
+        self.secret_token = secret_token
+        self.accepting = True
+        self.updates_received = 0
+        self.updates_rejected = 0
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret_token and request.headers.get(SECRET_TOKEN_HEADER) != self.secret_token:
+            return web.Response(status=401)
+
+        # Telegram redelivers rejected updates, so shedding load here is safe.
+        if not self.accepting or self.in_flight >= self.max_in_flight:
+            self.updates_rejected += 1
+            return web.Response(status=503, headers={"Retry-After": "1"})
+
+        try:
+            update: Dict[str, Any] = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        self.updates_received += 1
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Dict[str, Any]):
+        try:
+            await self.dp.feed_raw_update(self.bot, update)
+        except Exception as e:
+            logger.error(f"Error processing webhook update {update.get('update_id')}: {e}", exc_info=True)
+
+    async def drain(self, timeout: float):
+        self.accepting = False
+        if not self._tasks:
+            return
+        logger.info(f"Draining {len(self._tasks)} in-flight updates (timeout {timeout}s).")
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            logger.warning(f"Cancelling {len(pending)} updates still running after drain timeout.")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot):
+    if not settings.webhook_base_url:
+        raise RuntimeError("APP_WEBHOOK_BASE_URL must be set to run in webhook mode.")
+
+    update_handler = WebhookUpdateHandler(dp, bot, settings.webhook_max_in_flight, settings.webhook_secret)
+    app = web.Application(client_max_size=settings.webhook_max_body_size)
+    app.router.add_post(settings.webhook_path, update_handler.handle)
+
+    runner = web.AppRunner(app, handle_signals=False)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+    await site.start()
+    logger.info(f"Webhook server listening on {settings.webhook_host}:{settings.webhook_port}{settings.webhook_path}")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await dp.emit_startup(bot=bot, bots=[bot], dispatcher=dp, **dp.workflow_data)
+    try:
+        await bot.set_webhook(
+            url=f"{settings.webhook_base_url.rstrip('/')}{settings.webhook_path}",
+            secret_token=settings.webhook_secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=settings.webhook_max_connections
+        )
+        await stop_event.wait()
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        # Stop taking new updates first, then let the ones already accepted finish.
+        await update_handler.drain(settings.webhook_drain_timeout)
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot, bots=[bot], dispatcher=dp, **dp.workflow_data)
+        logger.info(f"Webhook server stopped: {update_handler.updates_received} updates received, {update_handler.updates_rejected} rejected.")
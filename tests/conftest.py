@@ -0,0 +1,12 @@
+import os
+
+# Importing src needs the required settings; the tests never reach Telegram or Postgres.
+for _name, _value in {
+    "APP_TELEGRAM_BOT_TOKEN": "0:test",
+    "APP_POSTGRES_USER": "test",
+    "APP_POSTGRES_PASSWORD": "test",
+    "APP_POSTGRES_HOST": "localhost",
+    "APP_POSTGRES_PORT": "5432",
+    "APP_POSTGRES_DB": "test",
+}.items():
+    os.environ.setdefault(_name, _value)
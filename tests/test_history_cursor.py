@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.db.models import Shift, ShiftStatus
+from src.keyboards.history import MOSCOW_TZ, decode_history_cursor, encode_history_cursor, history_selection_keyboard
+
+MAX_SHIFT_ID = 2 ** 31 - 1
+LATEST_END_TIME = datetime(9999, 12, 31, 23, 59, 59, 999999, tzinfo=MOSCOW_TZ)
+CALLBACK_DATA_LIMIT = 64
+
+
+def make_shift(shift_id: int, end_time: datetime) -> Shift:
+    return Shift(
+        id=shift_id, user_id=1, status=ShiftStatus.COMPLETED, start_time=end_time - timedelta(hours=8), end_time=end_time,
+        orders_count=10, total_mileage=80.0, total_tips=400.0, net_profit=3000.0
+    )
+
+
+def decode(token: str):
+    return decode_history_cursor(token.split(":"))
+
+
+@pytest.mark.parametrize("end_time", [
+    datetime(2025, 3, 30, 2, 30, 15, 123456, tzinfo=MOSCOW_TZ),
+    datetime(2025, 3, 29, 23, 30, 15, 123456, tzinfo=timezone.utc),
+    datetime(2025, 3, 30, 2, 30, 15, 123456, tzinfo=timezone(timedelta(hours=-5))),
+])
+def test_aware_end_time_round_trips_to_the_same_instant(end_time):
+    direction, decoded, shift_id = decode(encode_history_cursor("a", make_shift(17, end_time)))
+    assert (direction, decoded, shift_id) == ("a", end_time, 17)
+    assert decoded.tzinfo is not None
+
+
+def test_naive_end_time_is_read_as_moscow_time():
+    end_time = datetime(2025, 3, 30, 2, 30, 15, 123456)
+    _, decoded, _ = decode(encode_history_cursor("b", make_shift(17, end_time)))
+    assert decoded == end_time.replace(tzinfo=MOSCOW_TZ)
+    assert decoded.astimezone(MOSCOW_TZ).replace(tzinfo=None) == end_time
+
+
+@pytest.mark.parametrize("parts", [[], ["a", "1"], ["x", "1", "2"], ["a", "1", "2", "3"]])
+def test_decode_rejects_malformed_cursors(parts):
+    assert decode_history_cursor(parts) is None
+
+
+def test_decode_raises_value_error_for_non_numeric_parts():
+    # The page handler answers ValueError with a navigation error instead of failing the update.
+    with pytest.raises(ValueError):
+        decode_history_cursor(["a", "soon", "2"])
+
+
+def test_worst_case_cursor_fits_callback_data():
+    shift = make_shift(MAX_SHIFT_ID, LATEST_END_TIME)
+    for direction in ("a", "b", "c"):
+        callback_data = f"history:page:999999:{encode_history_cursor(direction, shift)}"
+        assert len(callback_data.encode("utf-8")) <= CALLBACK_DATA_LIMIT
+        assert decode(callback_data.split(":", 3)[3]) == (direction, LATEST_END_TIME, MAX_SHIFT_ID)
+
+
+def test_history_keyboard_callback_data_stays_within_limit():
+    shifts = [make_shift(MAX_SHIFT_ID - index, LATEST_END_TIME - timedelta(days=index)) for index in range(6)]
+    keyboard = history_selection_keyboard(shifts, 999998, 999999, has_next_page=True)
+    callbacks = [button.callback_data for row in keyboard.inline_keyboard for button in row]
+    assert any(callback.startswith("history:page:999997:b:") for callback in callbacks)
+    assert any(callback.startswith("history:page:999999:a:") for callback in callbacks)
+    assert all(len(callback.encode("utf-8")) <= CALLBACK_DATA_LIMIT for callback in callbacks)
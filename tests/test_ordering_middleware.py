@@ -0,0 +1,89 @@
+import asyncio
+
+from aiogram.types import User
+
+from src.middlewares.ordering import UserOrderingMiddleware
+
+
+def user_data(user_id: int) -> dict:
+    return {"event_from_user": User(id=user_id, is_bot=False, first_name=f"user{user_id}")}
+
+
+def test_updates_of_one_user_run_in_arrival_order():
+    middleware = UserOrderingMiddleware(max_in_flight=10)
+    log = []
+
+    async def handler(event, data):
+        user_id, number, delay = event
+        log.append(("start", user_id, number))
+        await asyncio.sleep(delay)
+        log.append(("end", user_id, number))
+        return number
+
+    async def main():
+        # The first update is the slowest, so without the per-user lock the later ones would overtake it.
+        updates = [(1, 1, 0.05), (1, 2, 0.0), (2, 1, 0.0), (1, 3, 0.01)]
+        results = await asyncio.gather(*(middleware(handler, update, user_data(update[0])) for update in updates))
+        return results, middleware.queued_users
+
+    results, queued_users = asyncio.run(main())
+
+    assert results == [1, 2, 1, 3]
+    user_one = [entry for entry in log if entry[1] == 1]
+    assert user_one == [("start", 1, 1), ("end", 1, 1), ("start", 1, 2), ("end", 1, 2), ("start", 1, 3), ("end", 1, 3)]
+    # Another user's update is not held back behind user 1's slow handler.
+    assert log.index(("end", 2, 1)) < log.index(("end", 1, 1))
+    assert queued_users == 0
+
+
+def test_user_entry_is_removed_after_the_last_update_even_on_errors():
+    middleware = UserOrderingMiddleware(max_in_flight=10)
+    seen_queued = []
+
+    async def handler(event, data):
+        seen_queued.append(middleware.queued_users)
+        if event == "fail":
+            raise RuntimeError("handler failed")
+        return event
+
+    async def main():
+        results = await asyncio.gather(
+            middleware(handler, "fail", user_data(1)),
+            middleware(handler, "ok", user_data(1)),
+            return_exceptions=True
+        )
+        return results
+
+    results = asyncio.run(main())
+
+    assert isinstance(results[0], RuntimeError) and results[1] == "ok"
+    assert seen_queued == [1, 1]
+    assert middleware.queued_users == 0
+
+
+def test_in_flight_is_capped_across_users():
+    middleware = UserOrderingMiddleware(max_in_flight=2)
+    peak = [0]
+
+    async def handler(event, data):
+        peak[0] = max(peak[0], middleware.in_flight)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(middleware(handler, None, user_data(user_id)) for user_id in range(6)))
+
+    asyncio.run(main())
+
+    assert peak[0] == 2
+    assert middleware.in_flight == 0
+    assert middleware.queued_users == 0
+
+
+def test_updates_without_a_user_skip_the_queue():
+    middleware = UserOrderingMiddleware(max_in_flight=1)
+
+    async def handler(event, data):
+        return middleware.queued_users
+
+    assert asyncio.run(middleware(handler, None, {})) == 0
+
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.db import replica
+from src.db.replica import ReplicaRouter
+
+USER_ID = 42
+
+
+class FakeSession:
+    def __init__(self, name: str, lag: float = 0.0, lag_error: Exception = None, read_error: Exception = None):
+        self.name = name
+        self.lag = lag
+        self.lag_error = lag_error
+        self.read_error = read_error
+        self.lag_queries = 0
+
+    async def scalar(self, stmt):
+        self.lag_queries += 1
+        if self.lag_error is not None:
+            raise self.lag_error
+        return self.lag
+
+
+class FakeSessionFactory:
+    def __init__(self, session: FakeSession):
+        self.session = session
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self.session
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+async def read_source(session: FakeSession) -> str:
+    if session.read_error is not None:
+        raise session.read_error
+    return session.name
+
+
+def replica_down() -> OperationalError:
+    return OperationalError("SELECT 1", {}, ConnectionRefusedError("replica is down"))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(replica.time, "monotonic", lambda: now[0])
+    return now
+
+
+def make_router(session: FakeSession = None, max_lag: float = 5.0, interval: float = 10.0) -> ReplicaRouter:
+    return ReplicaRouter(FakeSessionFactory(session) if session else None, max_lag, interval)
+
+
+def read(router: ReplicaRouter) -> str:
+    return asyncio.run(router.run_read_only(FakeSession("primary"), USER_ID, read_source))
+
+
+def test_reads_primary_without_replica(clock):
+    router = make_router()
+    assert read(router) == "primary"
+    assert router.primary_fallbacks == 1
+
+
+def test_reads_replica_within_lag(clock):
+    router = make_router(FakeSession("replica", lag=1.0))
+    assert read(router) == "replica"
+    assert router.healthy and router.lag == 1.0
+    assert router.replica_reads == 1
+
+
+def test_falls_back_when_replica_lags(clock):
+    router = make_router(FakeSession("replica", lag=12.0))
+    assert read(router) == "primary"
+    assert not router.healthy
+    assert router.primary_fallbacks == 1
+
+
+def test_lag_check_is_cached_for_the_interval(clock):
+    session = FakeSession("replica", lag=1.0)
+    router = make_router(session, interval=10.0)
+    read(router)
+    session.lag = 12.0
+    clock[0] += 5
+    assert read(router) == "replica"
+    assert session.lag_queries == 1
+
+    clock[0] += 5
+    assert read(router) == "primary"
+    assert session.lag_queries == 2
+
+
+def test_falls_back_when_lag_check_fails(clock):
+    router = make_router(FakeSession("replica", lag_error=replica_down()))
+    assert read(router) == "primary"
+    assert not router.healthy and router.lag is None
+
+
+def test_falls_back_when_replica_read_fails(clock):
+    session = FakeSession("replica", lag=0.0, read_error=replica_down())
+    router = make_router(session)
+    assert read(router) == "primary"
+    assert not router.healthy
+
+    # The failure counts as a health check, so the replica is left alone until the next interval.
+    session.read_error = None
+    clock[0] += 1
+    assert read(router) == "primary"
+    clock[0] += 10
+    assert read(router) == "replica"
+
+
+def test_unexpected_replica_errors_are_not_swallowed(clock):
+    router = make_router(FakeSession("replica", read_error=ValueError("bug in the query")))
+    with pytest.raises(ValueError):
+        read(router)
+
+
+def test_reads_own_writes_from_primary(clock):
+    router = make_router(FakeSession("replica", lag=0.0), max_lag=5.0)
+    router.mark_primary_write(USER_ID)
+    assert read(router) == "primary"
+    assert asyncio.run(router.run_read_only(FakeSession("primary"), USER_ID + 1, read_source)) == "replica"
+
+    clock[0] += 4.9
+    assert read(router) == "primary"
+    clock[0] += 0.2
+    assert read(router) == "replica"
+    assert USER_ID not in router._recent_writes
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.utils import shift_import
+from src.utils.shift_import import (
+    MOSCOW_TZ, ImportedShift, ShiftImportError, _parse_row, drop_duplicate_shifts, parse_import_file
+)
+
+NOW = datetime(2025, 6, 1, 12, 0, tzinfo=MOSCOW_TZ)
+HEADER = "start_time,end_time,orders_count,total_mileage,total_tips,food_expenses\n"
+
+
+def write_csv(tmp_path, text: str, encoding: str = "utf-8") -> str:
+    path = tmp_path / "shifts.csv"
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+
+def test_parse_row_accepts_local_formats_and_decimal_commas():
+    shift = _parse_row(
+        {"start_time": "01.05.2025 09:00", "end_time": "2025-05-01T17:30:15+03:00", "orders_count": "12",
+         "total_mileage": "84,5", "total_tips": "1 250", "food_expenses": ""},
+        NOW
+    )
+    assert shift.start_time == datetime(2025, 5, 1, 9, 0, tzinfo=MOSCOW_TZ)
+    assert shift.end_time == datetime(2025, 5, 1, 17, 30, 15, tzinfo=MOSCOW_TZ)
+    assert shift.orders_count == 12
+    assert shift.total_mileage == 84.5
+    assert shift.total_tips == 1250.0
+    assert shift.food_expenses == 0.0
+
+
+@pytest.mark.parametrize("row, message", [
+    ({"start_time": "01.05.2025 18:00", "end_time": "01.05.2025 09:00"}, "end_time раньше start_time"),
+    ({"start_time": "01.07.2025 09:00", "end_time": "01.07.2025 18:00"}, "end_time в будущем"),
+    ({"start_time": "вчера", "end_time": "01.05.2025 18:00"}, "не удалось разобрать дату 'вчера'"),
+    ({"start_time": "01.05.2025 09:00", "end_time": "01.05.2025 18:00", "total_tips": "-5"}, "total_tips не может быть отрицательным"),
+])
+def test_parse_row_rejects_invalid_values(row, message):
+    with pytest.raises(ValueError, match=message):
+        _parse_row(row, NOW)
+
+
+def test_parse_import_file_returns_all_rows(tmp_path):
+    path = write_csv(tmp_path, "﻿" + HEADER + "01.05.2025 09:00,01.05.2025 18:00,10,80,500,200\n"
+                                                   "02.05.2025 09:00,02.05.2025 18:00,,,,\n")
+    shifts = parse_import_file(path)
+    assert [shift.orders_count for shift in shifts] == [10, 0]
+    assert shifts[0].food_expenses == 200.0
+
+
+def test_parse_import_file_reports_csv_line_numbers(tmp_path):
+    path = write_csv(tmp_path, HEADER + "01.05.2025 09:00,01.05.2025 18:00,10,80,500,200\n"
+                                        "02.05.2025 18:00,02.05.2025 09:00,,,,\n"
+                                        "03.05.2025 09:00,03.05.2025 18:00,x,,,\n")
+    with pytest.raises(ShiftImportError) as error:
+        parse_import_file(path)
+    assert error.value.rows == 1
+    assert error.value.errors[0] == "строка 3: end_time раньше start_time"
+    assert error.value.errors[1].startswith("строка 4: ")
+
+
+def test_parse_import_file_caps_reported_errors(tmp_path, monkeypatch):
+    monkeypatch.setattr(shift_import, "IMPORT_MAX_REPORTED_ERRORS", 2)
+    path = write_csv(tmp_path, HEADER + "плохая,строка,,,,\n" * 5)
+    with pytest.raises(ShiftImportError) as error:
+        parse_import_file(path)
+    assert error.value.errors == ["строка 2: не удалось разобрать дату 'плохая'", "строка 3: не удалось разобрать дату 'плохая'"]
+
+
+def test_parse_import_file_rejects_missing_columns(tmp_path):
+    path = write_csv(tmp_path, "start_time,orders_count\n01.05.2025 09:00,3\n")
+    with pytest.raises(ShiftImportError) as error:
+        parse_import_file(path)
+    assert error.value.errors == ["строка 1: нет обязательных колонок: end_time"]
+
+
+def test_parse_import_file_rejects_empty_and_non_utf8_files(tmp_path):
+    with pytest.raises(ShiftImportError, match="в файле нет смен"):
+        parse_import_file(write_csv(tmp_path, HEADER))
+    with pytest.raises(ShiftImportError, match="UTF-8"):
+        parse_import_file(write_csv(tmp_path, HEADER + "01.05.2025 09:00,01.05.2025 18:00,,,,Щи\n", encoding="cp1251"))
+
+
+def test_parse_import_file_limits_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(shift_import, "IMPORT_MAX_ROWS", 2)
+    path = write_csv(tmp_path, HEADER + "01.05.2025 09:00,01.05.2025 18:00,,,,\n" * 3)
+    with pytest.raises(ShiftImportError, match="в файле больше 2 строк"):
+        parse_import_file(path)
+
+
+def test_drop_duplicate_shifts_skips_existing_and_repeated_rows():
+    start = datetime(2025, 5, 1, 9, 0, tzinfo=MOSCOW_TZ)
+    first = ImportedShift(start, start + timedelta(hours=8))
+    second = ImportedShift(start + timedelta(days=1, microseconds=250), start + timedelta(days=1, hours=8))
+    third = ImportedShift(start + timedelta(days=2), start + timedelta(days=2, hours=8))
+    # Postgres hands the existing keys back in UTC, already truncated to whole seconds.
+    existing = {(
+        second.start_time.replace(microsecond=0).astimezone(timezone.utc),
+        second.end_time.astimezone(timezone.utc),
+    )}
+
+    assert drop_duplicate_shifts([first, second, third, first], existing) == [first, third]
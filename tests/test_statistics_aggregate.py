@@ -0,0 +1,95 @@
+import math
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from src.db.statistics import PeriodTotals, TOTALS_FIELDS
+from src.utils.statistics_aggregate import StatisticsAggregate, shift_columns
+from src.utils.statistics_config import PROJECTION_CONFIG
+
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+START = datetime(2024, 3, 1, 9, 0, tzinfo=MOSCOW_TZ)
+
+
+def make_shift(day: int, hours: float, **values) -> SimpleNamespace:
+    start_time = START + timedelta(days=day)
+    fields = {
+        "start_time": start_time,
+        "end_time": start_time + timedelta(hours=hours),
+        "orders_count": 10,
+        "total_mileage": 80.0,
+        "rate": 300.0,
+        "order_rate": 50.0,
+        "mileage_rate": 5.0,
+        "total_tips": 400.0,
+        "food_expenses": 200.0,
+        "other_expenses": 0.0,
+    }
+    fields.update(values)
+    return SimpleNamespace(**fields)
+
+
+def summed_totals(shifts) -> PeriodTotals:
+    sums = dict.fromkeys(TOTALS_FIELDS, 0)
+    for shift in shifts:
+        totals = PeriodTotals.from_shift(shift)
+        for name in TOTALS_FIELDS:
+            sums[name] += getattr(totals, name)
+    return PeriodTotals(**sums)
+
+
+def assert_same_aggregate(actual: StatisticsAggregate, expected: StatisticsAggregate):
+    for name in TOTALS_FIELDS:
+        assert getattr(actual.totals, name) == pytest.approx(getattr(expected.totals, name)), name
+    for name in ("avg_hours_per_shift", "avg_orders_per_hour", "avg_mileage_per_order",
+                 "avg_profit_per_hour", "avg_profit_per_km", "avg_profit_per_order", "total_expenses"):
+        assert getattr(actual, name) == pytest.approx(getattr(expected, name)), name
+    assert actual.projections == pytest.approx(expected.projections)
+
+
+SHIFTS = [
+    make_shift(0, 8.0),
+    make_shift(1, 11.5, orders_count=23, total_mileage=140.2, total_tips=1250.5, other_expenses=310.0),
+    make_shift(2, 6.0, rate=None, order_rate=None, mileage_rate=None),
+    make_shift(3, 9.0, total_tips=None, food_expenses=None, other_expenses=None, orders_count=None, total_mileage=None),
+    make_shift(4, 7.0, end_time=None),
+    make_shift(5, 7.0, start_time=None),
+    make_shift(6, -2.0),
+]
+
+
+def test_columns_match_per_shift_totals():
+    assert_same_aggregate(StatisticsAggregate.from_shifts(SHIFTS), StatisticsAggregate.from_totals(summed_totals(SHIFTS)))
+
+
+def test_null_columns_count_as_zero():
+    aggregate = StatisticsAggregate.from_shifts([SHIFTS[3], SHIFTS[4], SHIFTS[5], SHIFTS[6]])
+    assert aggregate.totals.shifts_count == 4
+    assert aggregate.totals.duration_seconds == pytest.approx(9 * 3600)
+    assert aggregate.totals.orders_count == 3 * 10
+    assert aggregate.totals.total_tips == pytest.approx(3 * 400.0)
+    assert aggregate.totals.other_expenses == 0.0
+    # Missing timestamps and negative durations add no time, so only the 9-hour shift earns time revenue.
+    assert aggregate.totals.revenue_from_time == pytest.approx(9 * 300.0)
+
+
+def test_plain_sequences_are_accepted():
+    columns = {name: values.tolist() for name, values in shift_columns(SHIFTS[:2]).items()}
+    assert_same_aggregate(StatisticsAggregate.from_columns(**columns), StatisticsAggregate.from_totals(summed_totals(SHIFTS[:2])))
+
+
+def test_projections_scale_profit_per_hour():
+    aggregate = StatisticsAggregate.from_shifts(SHIFTS[:2])
+    assert aggregate.avg_profit_per_hour == pytest.approx(aggregate.totals.net_profit / aggregate.totals.duration_hours)
+    for key, config in PROJECTION_CONFIG.items():
+        assert aggregate.projections[key] == pytest.approx(aggregate.avg_profit_per_hour * config["hours"])
+
+
+def test_empty_period_has_no_averages():
+    aggregate = StatisticsAggregate.from_shifts([])
+    assert aggregate.totals == PeriodTotals()
+    assert aggregate.avg_profit_per_hour == 0.0 and aggregate.avg_mileage_per_order == 0.0
+    assert all(value == 0.0 for value in aggregate.projections.values())
+    assert not any(math.isnan(value) for value in aggregate.projections.values())